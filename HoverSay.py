@@ -1,33 +1,103 @@
 import sys
+import atexit
 import threading
 import time
+# شروع بارگذاری ماژول، مبنای گزارش --profile-startup
+MODULE_LOAD_STARTED = time.perf_counter()
 import os
-import tempfile
+import importlib
+import importlib.util
+import io
 import logging
 import csv
+import itertools
+import json
+import random
+import sqlite3
+import ctypes
+import ctypes.util
+import mmap
+import struct
+from collections import OrderedDict, deque
 from datetime import datetime
-import pyautogui
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
-from googletrans import Translator
-from langdetect import detect
-from gtts import gTTS
-import pygame
-import uuid
+import numpy as np
+from PIL import Image
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QCheckBox, QSlider, QSpinBox, QPushButton, QTextEdit, QScrollArea,
-    QMenuBar, QAction, QFileDialog, QMessageBox, QProgressBar
+    QCheckBox, QSlider, QSpinBox, QPushButton, QTextEdit, QScrollArea, QLineEdit,
+    QMenuBar, QAction, QActionGroup, QFileDialog, QMessageBox, QProgressBar
 )
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
-from pynput import mouse
 import re
 import unicodedata
+from functools import lru_cache
+from contextlib import contextmanager
 import shutil
-import keyboard
-import pyperclip
-from queue import Queue
-from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+
+# زمان‌سنجی راه‌اندازی؛ وابستگی‌های سنگین تنبل وارد می‌شوند تا پنجره زودتر نمایش داده شود
+class StartupProfile:
+    def __init__(self, started):
+        self.started = started
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.entries.append((name, seconds))
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def mark(self, name):
+        # زمان سپری‌شده از شروع بارگذاری ماژول
+        self.record(name, time.perf_counter() - self.started)
+
+    def report(self):
+        with self.lock:
+            return "\n".join(f"{name:36} {seconds * 1000:9.1f}ms" for name, seconds in self.entries)
+
+startup_profile = StartupProfile(MODULE_LOAD_STARTED)
+startup_profile.mark("import: eager modules")
+
+class LazyModule:
+    # ماژول در اولین دسترسی به یکی از صفت‌هایش وارد می‌شود
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                with startup_profile.step(f"import: {self._name}"):
+                    module = importlib.import_module(self._name)
+                    if self._on_load:
+                        self._on_load(module)
+                self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+def preload_modules(modules):
+    for module in modules:
+        module._load()
+
+pyautogui = LazyModule("pyautogui")
+googletrans = LazyModule("googletrans")
+langdetect_factory = LazyModule("langdetect.detector_factory")
+gtts = LazyModule("gtts")
+pygame = LazyModule("pygame")
+pynput_mouse = LazyModule("pynput.mouse")
+keyboard = LazyModule("keyboard")
 
 # تنظیم مسیر Tesseract
 def get_tesseract_path():
@@ -40,120 +110,2292 @@ def get_tesseract_path():
     else:
         return r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-pytesseract.pytesseract.tesseract_cmd = get_tesseract_path()
+def configure_pytesseract(module):
+    module.pytesseract.tesseract_cmd = get_tesseract_path()
 
-# تنظیم لاگ
-logging.basicConfig(
-    filename="translator_log.txt",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    encoding="utf-8"
-)
+pytesseract = LazyModule("pytesseract", configure_pytesseract)
+tesserocr = LazyModule("tesserocr") if importlib.util.find_spec("tesserocr") else None
 
-# پرچم مدیریت پخش صوت
-is_playing = False
-stop_playing = False
+OCR_LANG = 'eng+fas'
 
-# توابع پخش صوت
-def generate_and_play_audio(text, lang):
-    global is_playing, stop_playing
-    if is_playing:
-        logging.info("پخش صوت در حال اجرا است، پخش جدید نادیده گرفته شد.")
-        return
-    is_playing = True
-    stop_playing = False
+def get_tessdata_path():
+    if os.environ.get("TESSDATA_PREFIX"):
+        return os.environ["TESSDATA_PREFIX"]
+    tessdata = os.path.join(os.path.dirname(get_tesseract_path()), "tessdata")
+    if os.path.isdir(tessdata):
+        return tessdata
+    return None
+
+# داده‌های ماندگار در پوشه داده کاربر نگه داشته می‌شوند؛ پوشه اجرای برنامه ممکن است فقط‌خواندنی باشد
+def get_data_dir(app_name="HoverSay"):
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        app_name = app_name.lower()
+    return os.path.join(base, app_name)
+
+DATA_DIR = get_data_dir()
+
+# تنظیم لاگ: هر زیرسیستم لاگر خودش را دارد و نوشتن روی دیسک در رشته جداگانه QueueListener انجام می‌شود
+LOG_FILE = os.path.join(DATA_DIR, "translator_log.txt")
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+app_log = logging.getLogger("hoversay")
+capture_log = logging.getLogger("hoversay.capture")
+ocr_log = logging.getLogger("hoversay.ocr")
+translate_log = logging.getLogger("hoversay.translate")
+audio_log = logging.getLogger("hoversay.audio")
+history_log = logging.getLogger("hoversay.history")
+pipeline_log = logging.getLogger("hoversay.pipeline")
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging(log_file=LOG_FILE, level="INFO", subsystem_levels=None, json_lines=False,
+                  max_bytes=5 * 1024 * 1024, backup_count=5, when=None):
+    from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+    open_error = None
     try:
-        temp_audio_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.mp3")
-        tts = gTTS(text=text, lang=lang, slow=False)
-        tts.save(temp_audio_path)
-        logging.info(f"فایل صوتی تولید شد: {temp_audio_path}")
-        wait_for_file_write_complete(temp_audio_path)
-        play_audio(temp_audio_path)
-    except Exception as e:
-        logging.error(f"خطا در تولید/پخش صوت: {e}")
-        QMessageBox.critical(None, "خطا", "پخش صوت با خطا مواجه شد.")
-    finally:
-        is_playing = False
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if when:
+            file_handler = TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count, encoding="utf-8")
+        else:
+            file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                               encoding="utf-8")
+    except OSError as e:
+        # پوشه لاگ قابل نوشتن نیست؛ برنامه با لاگ روی stderr ادامه می‌دهد
+        open_error = e
+        file_handler = logging.StreamHandler()
+    file_handler.setFormatter(JsonLogFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    log_queue = Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    for name, subsystem_level in (subsystem_levels or {}).items():
+        logging.getLogger(f"hoversay.{name}").setLevel(subsystem_level)
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    if open_error is not None:
+        app_log.error(f"خطا در باز کردن فایل لاگ {log_file}: {open_error}")
+    return listener
+
+class LogRecordForwarder(logging.Handler):
+    # رکوردهای رسیده از پردازه‌های فرزند در پردازه اصلی به لاگر هم‌نام سپرده می‌شوند
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def current_log_levels():
+    names = [""] + [name for name in logging.root.manager.loggerDict if name.startswith("hoversay")]
+    return {name: logging.getLogger(name).level for name in names}
+
+def init_worker_logging(log_queue, levels):
+    # پردازه فرزند QueueHandler پردازه اصلی را به ارث می‌برد ولی رشته QueueListener آن را نه؛
+    # پس رکوردها به صف بین‌پردازه‌ای فرستاده می‌شوند که شنونده‌اش در پردازه اصلی است
+    from logging.handlers import QueueHandler
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
 
-def wait_for_file_write_complete(file_path, timeout=5):
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+def parse_log_levels(value):
+    # قالب: ocr=DEBUG,translate=WARNING
+    levels = {}
+    for item in filter(None, (value or "").split(",")):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+# ابزارگذاری مسیر داغ: هیستوگرام زمان هر مرحله و شمارنده‌ها
+class Histogram:
+    def __init__(self, size=2048):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        values = sorted(self.samples)
+        if not values:
+            return {"count": 0}
+
+        def at(fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "min_ms": values[0] * 1000,
+            "p50_ms": at(0.50),
+            "p95_ms": at(0.95),
+            "p99_ms": at(0.99),
+            "max_ms": values[-1] * 1000,
+        }
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.forwards = []
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            forwards = self.forwards
+        for target in forwards:
+            target.observe(name, seconds)
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            forwards = self.forwards
+        for target in forwards:
+            target.incr(name, amount)
+
+    @contextmanager
+    def forward_to(self, target):
+        # نمونه‌های این بازه در یک Metrics جداگانه هم ثبت می‌شوند، بدون پاک کردن آمار سراسری
+        with self.lock:
+            self.forwards = self.forwards + [target]
         try:
-            with open(file_path, "rb"):
+            yield target
+        finally:
+            with self.lock:
+                self.forwards = [forward for forward in self.forwards if forward is not target]
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timings": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def report(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name, stats in snapshot["timings"].items():
+            if stats["count"]:
+                lines.append(f"{name:24} n={stats['count']:<6} p50={stats['p50_ms']:8.2f}ms "
+                             f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms")
+        for name, value in snapshot["counters"].items():
+            lines.append(f"{name:24} {value}")
+        return "\n".join(lines)
+
+metrics = Metrics()
+
+# کش صوت تولیدشده (LRU محدود به حجم)
+class AudioCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self.entries[key] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+audio_cache = AudioCache()
+
+# توابع پخش صوت
+def gtts_synthesize(text, lang, slow=False):
+    buffer = io.BytesIO()
+    gtts.gTTS(text=text, lang=lang, slow=slow).write_to_fp(buffer)
+    return buffer.getvalue()
+
+speech_synthesizer = gtts_synthesize
+
+def synthesize_speech(text, lang, slow=False, synthesizer=None, cache=None):
+    # سنجش کارایی موتور ساختگی و کش خودش را می‌دهد تا وضعیت سراسری دست نخورد
+    synthesizer = synthesizer or speech_synthesizer
+    cache = audio_cache if cache is None else cache
+    key = (text, lang, slow)
+    audio_data = cache.get(key)
+    if audio_data is None:
+        metrics.incr("audio_cache_miss")
+        with metrics.timer("synthesize"):
+            audio_data = synthesizer(text, lang, slow)
+        cache.put(key, audio_data)
+        audio_log.debug("صوت تولید شد (%d بایت).", len(audio_data))
+    else:
+        metrics.incr("audio_cache_hit")
+        audio_log.debug("صوت از کش خوانده شد.")
+    return audio_data
+
+# تقسیم متن به جمله/عبارت برای تولید و پخش تکه‌تکه صوت
+CHUNK_BOUNDARY_RE = re.compile(r'(?<=[.!?؟;؛,،:…])\s+|\n+')
+
+def split_into_chunks(text, min_length=20, max_length=200):
+    chunks = []
+    current = ""
+    for part in CHUNK_BOUNDARY_RE.split(text.strip()):
+        if not part:
+            continue
+        current = f"{current} {part}" if current else part
+        if len(current) >= min_length:
+            chunks.append(current)
+            current = ""
+    if current:
+        if chunks and len(chunks[-1]) + len(current) < max_length:
+            chunks[-1] = f"{chunks[-1]} {current}"
+        else:
+            chunks.append(current)
+    result = []
+    for chunk in chunks:
+        while len(chunk) > max_length:
+            cut = chunk.rfind(' ', 0, max_length)
+            if cut <= 0:
+                cut = max_length
+            result.append(chunk[:cut])
+            chunk = chunk[cut:].lstrip()
+        if chunk:
+            result.append(chunk)
+    return result
+
+# سرویس ماندگار پخش صوت؛ mixer فقط یک بار راه‌اندازی می‌شود و فرمان‌ها از صف خوانده می‌شوند
+class AudioPlayer(threading.Thread):
+    def __init__(self, policy="latest"):
+        super().__init__(name="audio-player", daemon=True)
+        self.policy = policy
+        self.commands = Queue()
+        self.pending = deque()
+        self.generation = 0
+        self.skip_requested = False
+        self.mixer_ready = False
+        self.start_lock = threading.Lock()
+        # تکه‌های بعدی در این رشته تولید می‌شوند در حالی که تکه فعلی پخش می‌شود
+        self.synth_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self.last_time_to_first_sound = None
+        self.first_sound_times = deque(maxlen=100)
+        self.error_callback = None
+
+    def ensure_started(self):
+        with self.start_lock:
+            if not self.is_alive():
+                self.start()
+
+    def play(self, text, lang, slow=False):
+        self.ensure_started()
+        self.commands.put(("play", text, lang, slow, time.perf_counter()))
+
+    def replace(self, text, lang, slow=False):
+        self.ensure_started()
+        self.commands.put(("replace", text, lang, slow, time.perf_counter()))
+
+    def stop(self):
+        self.ensure_started()
+        self.commands.put(("stop",))
+
+    def warm_up(self):
+        # mixer در رشته پخش و پیش از اولین درخواست تلفظ راه‌اندازی می‌شود
+        self.ensure_started()
+        self.commands.put(("init",))
+
+    def skip(self):
+        self.ensure_started()
+        self.commands.put(("skip",))
+
+    def handle(self, command):
+        kind = command[0]
+        if kind == "skip":
+            self.skip_requested = True
+            return
+        if kind == "init":
+            try:
+                self.init_mixer()
+            except Exception as e:
+                audio_log.error(f"خطا در راه‌اندازی mixer: {e}")
+            return
+        if kind == "stop" or kind == "replace" or self.policy == "latest":
+            self.pending.clear()
+            self.generation += 1
+        if kind != "stop":
+            self.pending.append(command)
+
+    def drain(self):
+        while True:
+            try:
+                self.handle(self.commands.get_nowait())
+            except Empty:
                 return
-        except PermissionError:
-            time.sleep(0.1)
-    raise RuntimeError("فایل صوتی تا زمان مقرر قابل دسترسی نشد.")
 
-def play_audio(audio_file):
-    global stop_playing
-    try:
-        pygame.mixer.init()
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy() and not stop_playing:
-            time.sleep(0.1)
+    def init_mixer(self):
+        if not self.mixer_ready:
+            pygame.mixer.init()
+            self.mixer_ready = True
+
+    def run(self):
+        while True:
+            if not self.pending:
+                self.handle(self.commands.get())
+            self.drain()
+            if not self.pending:
+                continue
+            _, text, lang, slow, requested_at = self.pending.popleft()
+            generation = self.generation
+            self.skip_requested = False
+            futures = [self.synth_executor.submit(synthesize_speech, chunk, lang, slow)
+                       for chunk in split_into_chunks(text)]
+            try:
+                for index, future in enumerate(futures):
+                    audio_data = self.wait_for_chunk(future, generation)
+                    if audio_data is None:
+                        break
+                    self.init_mixer()
+                    if not self.play_audio(audio_data, requested_at if index == 0 else None, generation):
+                        break
+            except Exception as e:
+                audio_log.error(f"خطا در تولید/پخش صوت: {e}")
+                if self.error_callback:
+                    self.error_callback(str(e))
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def wait_for_chunk(self, future, generation):
+        while True:
+            try:
+                return future.result(timeout=0.05)
+            except FutureTimeoutError:
+                pass
+            self.drain()
+            if generation != self.generation:
+                return None
+
+    def play_audio(self, audio_data, requested_at, generation):
+        if self.skip_requested:
+            self.skip_requested = False
+            return True
+        with metrics.timer("play"):
+            pygame.mixer.music.load(io.BytesIO(audio_data), "mp3")
+            pygame.mixer.music.play()
+        if requested_at is not None:
+            self.last_time_to_first_sound = time.perf_counter() - requested_at
+            self.first_sound_times.append(self.last_time_to_first_sound)
+            metrics.observe("first_sound", self.last_time_to_first_sound)
+            audio_log.info(f"زمان تا شروع صدا: {self.last_time_to_first_sound * 1000:.0f}ms")
+        while pygame.mixer.music.get_busy():
+            try:
+                self.handle(self.commands.get(timeout=0.05))
+            except Empty:
+                continue
+            if generation != self.generation or self.skip_requested:
+                break
         pygame.mixer.music.stop()
-        pygame.mixer.quit()
-        time.sleep(0.3)
-        if os.path.exists(audio_file):
-            os.remove(audio_file)
-            logging.info("فایل صوتی موقت حذف شد.")
-    except Exception as e:
-        logging.error(f"خطا در پخش یا حذف صوت: {e}")
+        pygame.mixer.music.unload()
+        self.skip_requested = False
+        return generation == self.generation
+
+audio_player = AudioPlayer()
+
+def generate_and_play_audio(text, lang, slow=False):
+    audio_player.play(text, lang, slow)
 
 def stop_audio():
-    global stop_playing
-    stop_playing = True
-    pygame.mixer.music.stop()
+    audio_player.stop()
+
+def skip_audio():
+    audio_player.skip()
 
 # پاکسازی متن
+# جایگزینی نویسه‌هایی که OCR معمولاً با هم اشتباه می‌گیرد
+OCR_CONFUSION_MAP = {'|': 'I', '1': 'l', '0': 'O'}
+
+class TextNormalizer:
+    # نویسه‌های غیرقابل چاپ و نویسه‌های کنترلی جهت‌نما هم خارج از این مجموعه‌اند و در همین گذر حذف می‌شوند؛
+    # بازه ء-ي فقط الفبای عربی است و حروف ویژه فارسی (پ چ ژ ک گ ی) جداگانه اضافه شده‌اند
+    DISALLOWED_RE = re.compile(r'[^ء-يپچژکگیa-zA-Z0-9 .,!?؛،]+')
+    SPACES_RE = re.compile(r' {2,}')
+    REPEATED_PUNCT_RE = re.compile(r'([!?.,؛،])\1+')
+
+    def __init__(self, confusion_map=OCR_CONFUSION_MAP, min_length=2):
+        self.confusion_table = str.maketrans(confusion_map)
+        self.min_length = min_length
+
+    def clean(self, text):
+        try:
+            text = unicodedata.normalize('NFKC', text).translate(self.confusion_table)
+            text = self.DISALLOWED_RE.sub('', text)
+            text = self.SPACES_RE.sub(' ', text).strip()
+            text = self.REPEATED_PUNCT_RE.sub(r'\1', text)
+            if len(text) < self.min_length:
+                return ""
+            return text
+        except Exception as e:
+            ocr_log.error(f"خطا در پاکسازی متن: {e}")
+            return ""
+
+    def clean_many(self, texts):
+        clean = self.clean
+        return [clean(text) for text in texts]
+
+text_normalizer = TextNormalizer()
+
 def clean_text(text):
+    return text_normalizer.clean(text)
+
+# موتورهای ترجمه
+TRANSLATION_FAILED = "ترجمه امکان‌پذیر نیست."
+
+GOOGLE_MAX_REQUEST_CHARS = 4500
+
+class GoogleTranslateBackend:
+    # googletrans برای فهرست ورودی هم به ازای هر متن یک درخواست جدا می‌فرستد؛ برای همین متن‌ها
+    # هر کدام در یک خط، در یک درخواست بسته‌بندی و خروجی دوباره بر اساس خط‌ها جدا می‌شود
+    name = "google"
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self.translator = None
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        with self.lock:
+            if self.translator is None:
+                self.translator = googletrans.Translator(timeout=self.timeout)
+        return self.translator
+
+    def pack(self, texts):
+        chunk, size = [], 0
+        for text in texts:
+            text = " ".join(text.split())
+            if chunk and size + len(text) + 1 > GOOGLE_MAX_REQUEST_CHARS:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + 1
+        if chunk:
+            yield chunk
+
+    def translate_batch(self, texts, dest):
+        translator = self.warm_up()
+        translations = []
+        for chunk in self.pack(texts):
+            lines = translator.translate("\n".join(chunk), dest=dest).text.split("\n")
+            if len(lines) != len(chunk):
+                # ترجمه تعداد خط‌ها را حفظ نکرده است؛ فقط همین بسته تک‌به‌تک ترجمه می‌شود
+                translate_log.warning(f"تعداد خط‌های ترجمه ({len(lines)}) با بسته ({len(chunk)}) برابر نیست.")
+                lines = [translator.translate(text, dest=dest).text for text in chunk]
+            translations.extend(line.strip() for line in lines)
+        return translations
+
+class LocalTranslationBackend:
+    # جایگزین محلی بدون شبکه برای آزمایش و سنجش
+    name = "local"
+
+    def __init__(self, latency=0.0, glossary=None):
+        self.latency = latency
+        self.glossary = glossary or {}
+        self.calls = 0
+
+    def warm_up(self):
+        pass
+
+    def translate_batch(self, texts, dest):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self.glossary.get(text, f"[{dest}] {text}") for text in texts]
+
+TRANSLATION_BACKENDS = {
+    "google": GoogleTranslateBackend,
+    "local": LocalTranslationBackend,
+}
+
+def create_translation_backend(name="google"):
+    return TRANSLATION_BACKENDS[name]()
+
+# تجمیع درخواست‌های ترجمه در یک بازه کوتاه و ارسال دسته‌ای
+class TranslationBatcher:
+    def __init__(self, backend, window=0.05, max_batch=50, concurrency=2, timeout=10.0, retries=2, backoff=0.5):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = []
+        self.first_pending_at = 0.0
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        # جایگاه همزمانی تا بازگشت واقعی backend نگه داشته می‌شود، حتی اگر منتظرش مهلت را رد کرده باشد
+        self.backend_slots = threading.BoundedSemaphore(concurrency)
+        self.batches = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.dispatcher = threading.Thread(target=self.dispatch_loop, name="translation-batcher", daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, text, dest):
+        future = Future()
+        with self.condition:
+            if not self.pending:
+                self.first_pending_at = time.monotonic()
+            self.pending.append((text, dest, future))
+            self.requests += 1
+            self.condition.notify()
+        return future
+
+    def translate(self, text, dest):
+        return self.submit(text, dest).result()
+
+    def dispatch_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                # وقتی دسته‌ای در راه نیست صبر کردن فقط تأخیر اضافه می‌کند؛ درخواست تکی فوراً ارسال می‌شود
+                deadline = self.first_pending_at + self.window if self.in_flight else 0
+                while len(self.pending) < self.max_batch and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+                batch = self.pending[:self.max_batch]
+                self.pending = self.pending[self.max_batch:]
+                self.first_pending_at = time.monotonic()
+            groups = {}
+            for text, dest, future in batch:
+                groups.setdefault(dest, {}).setdefault(text, []).append(future)
+            for dest, waiting in groups.items():
+                self.batches += 1
+                with self.condition:
+                    self.in_flight += 1
+                self.executor.submit(self.run_batch, dest, waiting)
+
+    def call_backend(self, texts, dest):
+        # فراخوانی مسدودکننده در رشته جدا اجرا می‌شود تا بتوان برای آن مهلت گذاشت؛ رشته رهاشده
+        # جایگاهش را تا پایان درخواست نگه می‌دارد تا تلاش‌های دوباره روی مترجم کند انباشته نشوند
+        if not self.backend_slots.acquire(timeout=self.timeout):
+            raise TimeoutError("همه جایگاه‌های ترجمه هنوز درگیر درخواست‌های قبلی هستند.")
+        result = {}
+
+        def target():
+            try:
+                result["value"] = self.backend.translate_batch(texts, dest)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                self.backend_slots.release()
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        worker.join(self.timeout)
+        if worker.is_alive():
+            raise TimeoutError(f"مهلت ترجمه ({self.timeout}s) به پایان رسید.")
+        if "error" in result:
+            raise result["error"]
+        if len(result["value"]) != len(texts):
+            raise ValueError("تعداد ترجمه‌های برگشتی با تعداد متن‌ها برابر نیست.")
+        return result["value"]
+
+    def run_batch(self, dest, waiting):
+        try:
+            self.translate_waiting(dest, waiting)
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify()
+
+    def translate_waiting(self, dest, waiting):
+        texts = list(waiting)
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                translations = self.call_backend(texts, dest)
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    for futures in waiting.values():
+                        for future in futures:
+                            future.set_exception(e)
+                    return
+                translate_log.warning(f"خطا در ترجمه دسته‌ای، تلاش دوباره پس از {delay:.1f}s: {e}")
+                time.sleep(delay)
+                delay *= 2
+        for text, translation in zip(texts, translations):
+            for future in waiting[text]:
+                future.set_result(translation)
+
+def prepare_db_path(path):
+    if path == ":memory:":
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # پایگاه داده نسخه‌های قبلی کنار برنامه ساخته می‌شد؛ یک بار به مسیر جدید کپی می‌شود
+    legacy = os.path.basename(path)
+    if os.path.exists(path) or not os.path.exists(legacy) or os.path.abspath(legacy) == os.path.abspath(path):
+        return
     try:
-        text = unicodedata.normalize('NFKC', text)
-        text = ''.join(ch for ch in text if ch.isprintable())
-        text = text.replace('|', 'I').replace('1', 'l').replace('0', 'O')
-        text = re.sub(r'[\u200c\u200b-\u200f\u202a-\u202e]', '', text)
-        text = re.sub(r'[^ء-يa-zA-Z0-9\s\.,!?؛،]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = re.sub(r'([!?.,؛،])\1+', r'\1', text)
-        if len(text) < 2:
+        source = sqlite3.connect(legacy)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        app_log.info(f"{legacy} به {path} منتقل شد.")
+    except sqlite3.Error as e:
+        app_log.error(f"خطا در انتقال {legacy} به {path}: {e}")
+
+# کش دو سطحی ترجمه (LRU در حافظه + SQLite روی دیسک)
+TRANSLATION_CACHE_PATH = os.path.join(DATA_DIR, "translation_cache.db")
+
+def normalize_cache_key(text):
+    return ' '.join(text.split()).casefold()
+
+class TranslationCache:
+    def __init__(self, path=TRANSLATION_CACHE_PATH, memory_size=512, max_rows=50000, ttl=30 * 24 * 3600):
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.puts_since_evict = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0}
+        try:
+            prepare_db_path(path)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "text TEXT NOT NULL, src TEXT NOT NULL, dest TEXT NOT NULL, "
+                "translation TEXT NOT NULL, created REAL NOT NULL, "
+                "PRIMARY KEY (text, src, dest))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_created ON translations(created)")
+            self.conn.commit()
+            self.evict()
+        except (sqlite3.Error, OSError) as e:
+            translate_log.error(f"خطا در باز کردن کش ترجمه، فقط کش حافظه فعال است: {e}")
+            self.conn = None
+
+    def get(self, text, src, dest, allow_stale=False):
+        key = (normalize_cache_key(text), src, dest)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None and self.conn is not None:
+                try:
+                    row = self.conn.execute(
+                        "SELECT translation, created FROM translations WHERE text=? AND src=? AND dest=?", key
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    translate_log.error(f"خطا در خواندن کش ترجمه: {e}")
+                    row = None
+                if row is not None:
+                    entry = row
+                    self.remember(key, entry)
+                    if now - entry[1] <= self.ttl:
+                        self.counters["disk_hits"] += 1
+                        return entry[0]
+            elif entry is not None:
+                self.memory.move_to_end(key)
+                if now - entry[1] <= self.ttl:
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+            if entry is not None and allow_stale:
+                self.counters["stale_hits"] += 1
+                return entry[0]
+            if not allow_stale:
+                self.counters["misses"] += 1
+            return None
+
+    def put(self, text, src, dest, translation):
+        key = (normalize_cache_key(text), src, dest)
+        entry = (translation, time.time())
+        with self.lock:
+            self.remember(key, entry)
+            if self.conn is None:
+                return
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", key + entry)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                translate_log.error(f"خطا در نوشتن کش ترجمه: {e}")
+            self.puts_since_evict += 1
+            if self.puts_since_evict >= 100:
+                self.evict()
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        self.puts_since_evict = 0
+        try:
+            self.conn.execute("DELETE FROM translations WHERE created < ?", (time.time() - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                "SELECT rowid FROM translations ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            translate_log.error(f"خطا در پاکسازی کش ترجمه: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.conn is None:
+                return
+            try:
+                self.conn.execute("DELETE FROM translations")
+                self.conn.commit()
+            except sqlite3.Error as e:
+                translate_log.error(f"خطا در پاکسازی کش ترجمه: {e}")
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+# واژه‌نامه آفلاین فارسی↔انگلیسی: آرایه مرتب کلیدها در فایل نگاشت‌شده در حافظه با جست‌وجوی دودویی
+# قالب فایل: امضا | تعداد رکورد (uint32) | آفست‌ها (uint32 × تعداد+1) | رکوردهای "fa:کلید\tترجمه"
+DICTIONARY_PATH = os.path.join(DATA_DIR, "dictionary.idx")
+DICTIONARY_MAGIC = b"HSDICT1\0"
+DICTIONARY_MAX_WORDS = 3
+# نیم‌فاصله مثل clean_text حذف می‌شود تا کلید ساخته‌شده با متن پاک‌شده زمان اجرا یکی باشد
+DICTIONARY_KEY_MAP = str.maketrans({'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', '\u0640': None, '\u200c': None})
+DICTIONARY_STRIP_CHARS = " .,;:!?\"'()[]{}«»،؛؟-"
+ARABIC_DIACRITICS_RE = re.compile(r'[\u064B-\u0652\u0670]')
+
+def normalize_dictionary_key(text):
+    text = ARABIC_DIACRITICS_RE.sub('', text.translate(DICTIONARY_KEY_MAP))
+    return normalize_cache_key(text).strip(DICTIONARY_STRIP_CHARS)
+
+def build_dictionary(sources, path=DICTIONARY_PATH):
+    # هر سطر یک جفت فارسی/انگلیسی است (ترتیب ستون‌ها مهم نیست)؛ برای هر کلید اولین معنی نگه داشته می‌شود
+    entries = {}
+    for source in sources:
+        delimiter = "," if source.lower().endswith(".csv") else "\t"
+        with open(source, newline='', encoding="utf-8") as f:
+            for row in csv.reader(f, delimiter=delimiter):
+                if len(row) < 2:
+                    continue
+                first, second = row[0].strip(), row[1].strip()
+                if not ARABIC_SCRIPT_RE.search(first):
+                    first, second = second, first
+                # سطر عنوان یا جفت‌های بدون طرف فارسی/انگلیسی کنار گذاشته می‌شوند
+                if not ARABIC_SCRIPT_RE.search(first) or ARABIC_SCRIPT_RE.search(second):
+                    continue
+                for lang, word, translation in (("fa", first, second), ("en", second, first)):
+                    key = normalize_dictionary_key(word)
+                    if key:
+                        entries.setdefault(f"{lang}:{key}", " ".join(translation.split()))
+    records = [f"{key}\t{entries[key]}".encode("utf-8") for key in sorted(entries, key=lambda k: k.encode("utf-8"))]
+    offsets = np.zeros(len(records) + 1, dtype="<u4")
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(DICTIONARY_MAGIC)
+        f.write(struct.pack("<I", len(records)))
+        f.write(offsets.tobytes())
+        f.writelines(records)
+    os.replace(temp_path, path)
+    return len(records)
+
+class OfflineDictionary:
+    # فایل فقط با اولین جست‌وجو باز می‌شود تا راه‌اندازی برنامه کند نشود
+    def __init__(self, path=DICTIONARY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.file = None
+        self.mm = None
+        self.offsets = None
+        self.count = 0
+        self.data_start = 0
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            if not os.path.exists(self.path):
+                translate_log.info(f"واژه‌نامه آفلاین ({self.path}) پیدا نشد.")
+                return
+            try:
+                self.file = open(self.path, "rb")
+                mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                if mm[:len(DICTIONARY_MAGIC)] != DICTIONARY_MAGIC:
+                    mm.close()
+                    raise ValueError("قالب فایل واژه‌نامه نامعتبر است")
+                header = len(DICTIONARY_MAGIC)
+                self.count = struct.unpack_from("<I", mm, header)[0]
+                self.offsets = np.frombuffer(mm, dtype="<u4", count=self.count + 1, offset=header + 4)
+                self.data_start = header + 4 + 4 * (self.count + 1)
+                self.mm = mm
+                translate_log.info(f"واژه‌نامه آفلاین با {self.count} مدخل بارگذاری شد.")
+            except Exception as e:
+                translate_log.error(f"خطا در بارگذاری واژه‌نامه آفلاین: {e}")
+                self.offsets = None
+                if self.file:
+                    self.file.close()
+                    self.file = None
+
+    def available(self):
+        if not self.loaded:
+            self.load()
+        return self.mm is not None
+
+    def record_at(self, index):
+        start = self.data_start + int(self.offsets[index])
+        end = self.data_start + int(self.offsets[index + 1])
+        separator = self.mm.find(b"\t", start, end)
+        return self.mm[start:separator], separator, end
+
+    def lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record_at(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, text, src_lang):
+        if not self.available():
+            return None
+        key = f"{src_lang}:{normalize_dictionary_key(text)}".encode("utf-8")
+        # جست‌وجو و close زیر یک قفل هستند تا mmap وسط خواندن بسته نشود
+        with self.lock:
+            if self.mm is None:
+                return None
+            index = self.lower_bound(key)
+            if index < self.count:
+                record_key, separator, end = self.record_at(index)
+                if record_key == key:
+                    return self.mm[separator + 1:end].decode("utf-8")
+        return None
+
+    def prefix(self, text, src_lang, limit=10):
+        if not self.available():
+            return []
+        prefix = f"{src_lang}:{normalize_dictionary_key(text)}".encode("utf-8")
+        matches = []
+        with self.lock:
+            if self.mm is None:
+                return []
+            index = self.lower_bound(prefix)
+            while index < self.count and len(matches) < limit:
+                record_key, separator, end = self.record_at(index)
+                if not record_key.startswith(prefix):
+                    break
+                word = record_key[len(src_lang) + 1:].decode("utf-8")
+                matches.append((word, self.mm[separator + 1:end].decode("utf-8")))
+                index += 1
+        return matches
+
+    def close(self):
+        with self.lock:
+            # پس از بستن، جست‌وجوی دیرهنگام فایل را دوباره باز نمی‌کند
+            self.loaded = True
+            # نمای numpy باید پیش از بستن mmap رها شود
+            self.offsets = None
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            if self.file:
+                self.file.close()
+                self.file = None
+
+# تاریخچه ماندگار در SQLite با جست‌وجوی تمام‌متن
+HISTORY_DB_PATH = os.path.join(DATA_DIR, "history.db")
+HISTORY_FIELDS = ["timestamp", "text", "language", "translation"]
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = None
+        try:
+            prepare_db_path(path)
+            self.open(path)
+        except (sqlite3.Error, OSError) as e:
+            # مسیر فقط‌خواندنی یا قفل‌شده نباید جلوی اجرای برنامه را بگیرد
+            history_log.error(f"خطا در باز کردن تاریخچه ({path})، تاریخچه فقط در حافظه نگه داشته می‌شود: {e}")
+            if self.conn is not None:
+                self.conn.close()
+            self.open(":memory:")
+
+    def open(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, text TEXT NOT NULL, "
+            "language TEXT NOT NULL, translation TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_language ON history(language)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_text ON history(text)")
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                "text, translation, content='history', content_rowid='id')"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN "
+                "INSERT INTO history_fts(rowid, text, translation) VALUES (new.id, new.text, new.translation); END"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE ON history BEGIN "
+                "INSERT INTO history_fts(history_fts, rowid, text, translation) "
+                "VALUES ('delete', old.id, old.text, old.translation); "
+                "INSERT INTO history_fts(rowid, text, translation) VALUES (new.id, new.text, new.translation); END"
+            )
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            history_log.error(f"FTS5 در دسترس نیست، جست‌وجوی تاریخچه با LIKE انجام می‌شود: {e}")
+            self.fts = False
+        self.conn.commit()
+
+    def add(self, record):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO history (timestamp, text, language, translation) VALUES (?, ?, ?, ?)",
+                [record[field] for field in HISTORY_FIELDS]
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def where_clause(self, query):
+        if not query:
+            return "", []
+        if self.fts:
+            # عبارت داخل گیومه با * تا جست‌وجو هنگام تایپ روی پیشوند هم کار کند
+            phrase = '"' + query.replace('"', '""') + '"*'
+            return "WHERE id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)", [phrase]
+        pattern = f"%{query}%"
+        return "WHERE text LIKE ? OR translation LIKE ?", [pattern, pattern]
+
+    def count(self, query=None):
+        where, params = self.where_clause(query)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+
+    def page(self, page, page_size, query=None):
+        where, params = self.where_clause(query)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM history {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_batches(self, batch_size=500):
+        if self.path == ":memory:":
+            # پایگاه داده حافظه‌ای از اتصال دوم دیده نمی‌شود
+            with self.lock:
+                rows = [dict(row) for row in self.conn.execute("SELECT * FROM history ORDER BY id")]
+            for start in range(0, len(rows), batch_size):
+                yield rows[start:start + batch_size]
+            return
+        # اتصال جدا برای رشته‌های پس‌زمینه تا خواندن طولانی جلوی ثبت رکورد جدید را نگیرد
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute("SELECT * FROM history ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def update_translations(self, pairs):
+        with self.lock:
+            self.conn.executemany("UPDATE history SET translation = ? WHERE id = ?", pairs)
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# موتورهای OCR
+class PytesseractBackend:
+    name = "pytesseract"
+
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+
+    def image_to_string(self, image, psm=None):
+        config = f"--psm {psm}" if psm else ""
+        return pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+    def image_to_data(self, image):
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            if not text.strip():
+                continue
+            words.append({
+                "text": text,
+                "conf": float(data["conf"][i]),
+                "left": data["left"][i],
+                "top": data["top"][i],
+                "width": data["width"][i],
+                "height": data["height"][i],
+                "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+            })
+        return words
+
+    def close(self):
+        pass
+
+class TesserocrBackend:
+    # موتور tesseract یک بار با مدل‌های زبان بارگذاری می‌شود و برای همه ضبط‌ها باقی می‌ماند
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+        self.lock = threading.Lock()
+        tessdata = get_tessdata_path()
+        if tessdata:
+            self.api = tesserocr.PyTessBaseAPI(path=tessdata, lang=lang)
+        else:
+            self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def set_image(self, image):
+        if isinstance(image, np.ndarray):
+            image = np.ascontiguousarray(image, dtype=np.uint8)
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        else:
+            self.api.SetImage(image)
+
+    def image_to_string(self, image, psm=None):
+        with self.lock:
+            self.set_image(image)
+            if psm is None:
+                return self.api.GetUTF8Text()
+            default_psm = self.api.GetPageSegMode()
+            self.api.SetPageSegMode(psm)
+            try:
+                return self.api.GetUTF8Text()
+            finally:
+                self.api.SetPageSegMode(default_psm)
+
+    def image_to_data(self, image):
+        level = tesserocr.RIL.WORD
+        words = []
+        line = 0
+        with self.lock:
+            self.set_image(image)
+            self.api.Recognize()
+            for word in tesserocr.iterate_level(self.api.GetIterator(), level):
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(level)
+                box = word.BoundingBox(level)
+                if not text or not text.strip() or box is None:
+                    continue
+                x1, y1, x2, y2 = box
+                words.append({
+                    "text": text,
+                    "conf": word.Confidence(level),
+                    "left": x1,
+                    "top": y1,
+                    "width": x2 - x1,
+                    "height": y2 - y1,
+                    "line": line,
+                })
+        return words
+
+    def close(self):
+        with self.lock:
+            self.api.End()
+
+def create_ocr_backend(lang=OCR_LANG, prefer="tesserocr"):
+    if prefer == "tesserocr" and tesserocr is not None:
+        try:
+            backend = TesserocrBackend(lang)
+            ocr_log.info("موتور OCR ماندگار (tesserocr) بارگذاری شد.")
+            return backend
+        except Exception as e:
+            ocr_log.error(f"خطا در بارگذاری tesserocr، استفاده از pytesseract: {e}")
+    return PytesseractBackend(lang)
+
+# مراحل پیش‌پردازش تصویر روی آرایه‌های numpy (ورودی و خروجی هر مرحله uint8 است)
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# شبکه مرتب‌سازی ۱۹ مرحله‌ای برای میانه ۹ عنصری (فیلتر میانه ۳×۳)
+MEDIAN9_NETWORK = [
+    (1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8), (0, 3),
+    (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4), (4, 2),
+]
+
+def stage_grayscale(arr):
+    if arr.ndim == 2:
+        return arr
+    gray = arr[..., :3].astype(np.float32) @ GRAY_WEIGHTS
+    gray += 0.5
+    return gray.astype(np.uint8)
+
+def stage_invert(arr, mode="auto"):
+    # متن روشن روی زمینه تیره (تم‌های تاریک) برای tesseract معکوس می‌شود
+    if mode == "always" or (mode == "auto" and arr.mean() < 128):
+        return 255 - arr
+    return arr
+
+def stage_upscale(arr, factor=2, max_side=300):
+    if factor <= 1 or max(arr.shape[:2]) >= max_side:
+        return arr
+    return arr.repeat(factor, axis=0).repeat(factor, axis=1)
+
+def stage_contrast(arr, factor=2.0):
+    mean = int(arr.mean() + 0.5)
+    out = arr.astype(np.float32)
+    out -= mean
+    out *= factor
+    out += mean + 0.5
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+def stage_denoise(arr):
+    height, width = arr.shape
+    padded = np.pad(arr, 1, mode='edge')
+    values = [padded[dy:dy + height, dx:dx + width].copy() for dy in range(3) for dx in range(3)]
+    for i, j in MEDIAN9_NETWORK:
+        low = np.minimum(values[i], values[j])
+        np.maximum(values[i], values[j], out=values[j])
+        values[i] = low
+    return values[4]
+
+def otsu_threshold(arr):
+    hist = np.bincount(arr.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    mean_bg = sum_bg / np.maximum(weight_bg, 1)
+    mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+    variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(variance))
+
+def adaptive_threshold_map(arr, block=31, offset=10):
+    pad = block // 2
+    padded = np.pad(arr, pad + 1, mode='edge')
+    integral = padded.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+    height, width = arr.shape
+    window_sum = (integral[block:block + height, block:block + width]
+                  - integral[:height, block:block + width]
+                  - integral[block:block + height, :width]
+                  + integral[:height, :width])
+    return window_sum / (block * block) - offset
+
+def stage_threshold(arr, method="otsu", threshold=140, block=31, offset=10):
+    if method == "otsu":
+        threshold = otsu_threshold(arr)
+    elif method == "adaptive":
+        threshold = adaptive_threshold_map(arr, block, offset)
+    return np.where(arr > threshold, np.uint8(255), np.uint8(0))
+
+PREPROCESS_STAGES = {
+    "grayscale": stage_grayscale,
+    "invert": stage_invert,
+    "upscale": stage_upscale,
+    "contrast": stage_contrast,
+    "denoise": stage_denoise,
+    "threshold": stage_threshold,
+}
+
+DEFAULT_PREPROCESS_CONFIG = [
+    ("grayscale", {}),
+    ("invert", {"mode": "auto"}),
+    ("upscale", {"factor": 2, "max_side": 300}),
+    ("contrast", {"factor": 2.0}),
+    ("denoise", {}),
+    ("threshold", {"method": "otsu"}),
+]
+
+class PreprocessPipeline:
+    def __init__(self, config=None):
+        self.stages = [(name, PREPROCESS_STAGES[name], params)
+                       for name, params in (config or DEFAULT_PREPROCESS_CONFIG)]
+        self.last_timings = {}
+
+    def run(self, image):
+        arr = image if isinstance(image, np.ndarray) else np.asarray(image)
+        timings = {}
+        for name, stage, params in self.stages:
+            start = time.perf_counter()
+            arr = stage(arr, **params)
+            elapsed = time.perf_counter() - start
+            metrics.observe(f"preprocess.{name}", elapsed)
+            timings[name] = elapsed * 1000
+        self.last_timings = timings
+        return arr
+
+# انتخاب کلمه یا خط زیر نشانگر از روی چیدمان کلمات tesseract
+OCR_TARGETS = [("region", "کل ناحیه"), ("line", "خط زیر نشانگر"), ("word", "کلمه زیر نشانگر")]
+OCR_TARGET_PSM = {"word": 8, "line": 7}
+OCR_MIN_CONFIDENCE = 60
+OCR_CROP_PADDING = 4
+
+def box_distance(word, x, y):
+    dx = max(word["left"] - x, 0, x - (word["left"] + word["width"]))
+    dy = max(word["top"] - y, 0, y - (word["top"] + word["height"]))
+    return dx * dx + dy * dy
+
+# موتور OCR و سرویس ترجمه، مستقل از رابط کاربری تا در حالت دسته‌ای هم استفاده شوند
+class OcrEngine:
+    def __init__(self, preprocess_config=None, ocr_backend=None):
+        self.ocr_backend = ocr_backend
+        self.backend_lock = threading.Lock()
+        self.preprocess_pipeline = PreprocessPipeline(preprocess_config)
+
+    def ensure_backend(self):
+        # مدل‌های tesseract در اولین OCR یا در آماده‌سازی پس‌زمینه بارگذاری می‌شوند
+        with self.backend_lock:
+            if self.ocr_backend is None:
+                self.ocr_backend = create_ocr_backend()
+        return self.ocr_backend
+
+    def preprocess_image(self, image):
+        try:
+            with metrics.timer("preprocess"):
+                processed = self.preprocess_pipeline.run(image)
+            if ocr_log.isEnabledFor(logging.DEBUG):
+                timings = ", ".join(f"{name}={ms:.1f}ms" for name, ms in self.preprocess_pipeline.last_timings.items())
+                ocr_log.debug("پیش‌پردازش تصویر انجام شد (%s).", timings)
+            return processed
+        except Exception as e:
+            ocr_log.error(f"خطا در پیش‌پردازش تصویر: {e}")
+            return image
+
+    def extract_text_from_image(self, image):
+        try:
+            with metrics.timer("ocr"):
+                text = self.ensure_backend().image_to_string(image)
+            ocr_log.debug("متن استخراج شد: %s", text.strip())
+            return text.strip()
+        except Exception as e:
+            ocr_log.error(f"خطا در استخراج متن: {e}")
             return ""
-        return text
+
+    def extract_words(self, image):
+        try:
+            with metrics.timer("ocr_layout"):
+                return self.ensure_backend().image_to_data(image)
+        except Exception as e:
+            ocr_log.error(f"خطا در استخراج چیدمان کلمات: {e}")
+            return []
+
+    def extract_text_at_cursor(self, image, processed, cursor, target="word",
+                               min_confidence=OCR_MIN_CONFIDENCE, refine=False):
+        # خروجی: متن کلمه/خط نزدیک نشانگر و کادر آن در مختصات تصویر ضبط‌شده
+        processed = np.asarray(processed)
+        width, height = (image.shape[1], image.shape[0]) if isinstance(image, np.ndarray) else image.size
+        # پیش‌پردازش ممکن است تصویر را بزرگ کرده باشد، پس نشانگر هم به همان مقیاس برده می‌شود
+        scale_x = processed.shape[1] / width
+        scale_y = processed.shape[0] / height
+        words = [word for word in self.extract_words(processed) if word["conf"] >= min_confidence]
+        if not words:
+            return "", None
+        x, y = cursor[0] * scale_x, cursor[1] * scale_y
+        nearest = min(words, key=lambda word: box_distance(word, x, y))
+        selected = [nearest] if target == "word" else [word for word in words if word["line"] == nearest["line"]]
+        left = min(word["left"] for word in selected)
+        top = min(word["top"] for word in selected)
+        right = max(word["left"] + word["width"] for word in selected)
+        bottom = max(word["top"] + word["height"] for word in selected)
+        text = " ".join(word["text"].strip() for word in selected)
+        if refine:
+            crop = processed[max(top - OCR_CROP_PADDING, 0):bottom + OCR_CROP_PADDING,
+                             max(left - OCR_CROP_PADDING, 0):right + OCR_CROP_PADDING]
+            try:
+                with metrics.timer("ocr_refine"):
+                    refined = self.ensure_backend().image_to_string(crop, psm=OCR_TARGET_PSM[target]).strip()
+                if refined:
+                    text = refined
+            except Exception as e:
+                ocr_log.error(f"خطا در OCR مجدد برش: {e}")
+        ocr_log.debug("متن زیر نشانگر استخراج شد: %s", text)
+        box = (int(left / scale_x), int(top / scale_y),
+               max(int((right - left) / scale_x), 1), max(int((bottom - top) / scale_y), 1))
+        return text, box
+
+class TranslationService:
+    def __init__(self, translator="google", backend=None, cache_path=TRANSLATION_CACHE_PATH,
+                 dictionary_path=DICTIONARY_PATH):
+        self.translation_batcher = TranslationBatcher(backend or create_translation_backend(translator))
+        self.translation_cache = TranslationCache(cache_path)
+        self.dictionary = OfflineDictionary(dictionary_path) if dictionary_path else None
+
+    def translate_text(self, text):
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts):
+        # همه متن‌های بدون کش یک‌جا به batcher سپرده می‌شوند تا در چند درخواست دسته‌ای ترجمه شوند
+        results = [None] * len(texts)
+        pending = []
+        start = time.perf_counter()
+        for index, text in enumerate(texts):
+            with metrics.timer("detect"):
+                detected_lang = detect_language(text)
+            dest_lang = 'en' if detected_lang == 'fa' else 'fa'
+            # کلمه‌ها و عبارت‌های کوتاه بدون کش و شبکه از واژه‌نامه آفلاین پاسخ داده می‌شوند
+            if self.dictionary is not None and len(text.split()) <= DICTIONARY_MAX_WORDS:
+                with metrics.timer("dictionary"):
+                    entry = self.dictionary.lookup(text, detected_lang)
+                if entry is not None:
+                    metrics.incr("dictionary_hit")
+                    translate_log.debug("ترجمه از واژه‌نامه آفلاین خوانده شد: %s", entry)
+                    results[index] = (detected_lang, entry)
+                    continue
+                metrics.incr("dictionary_miss")
+            cached = self.translation_cache.get(text, detected_lang, dest_lang)
+            if cached is not None:
+                metrics.incr("translation_cache_hit")
+                translate_log.debug("ترجمه از کش خوانده شد: %s", cached)
+                results[index] = (detected_lang, cached)
+            else:
+                metrics.incr("translation_cache_miss")
+                future = self.translation_batcher.submit(text, dest_lang)
+                pending.append((index, text, detected_lang, dest_lang, future))
+        for index, text, detected_lang, dest_lang, future in pending:
+            try:
+                translation_text = future.result()
+                metrics.observe("translate", time.perf_counter() - start)
+                self.translation_cache.put(text, detected_lang, dest_lang, translation_text)
+                translate_log.debug("ترجمه انجام شد: %s", translation_text)
+            except Exception as e:
+                metrics.incr("translate_error")
+                translate_log.error(f"خطا در ترجمه: {e}")
+                # اگر مترجم در دسترس نباشد ترجمه منقضی‌شده کش بهتر از هیچ است
+                translation_text = self.translation_cache.get(text, detected_lang, dest_lang, allow_stale=True)
+                if translation_text is None:
+                    translation_text = TRANSLATION_FAILED
+            results[index] = (detected_lang, translation_text)
+        return results
+
+    def warm_up(self):
+        self.translation_batcher.backend.warm_up()
+        if self.dictionary is not None:
+            self.dictionary.available()
+
+    def close(self):
+        translate_log.info(f"آمار کش ترجمه: {self.translation_cache.stats()}")
+        self.translation_cache.close()
+        if self.dictionary is not None:
+            self.dictionary.close()
+
+# تشخیص زبان: مسیر سریع با نسبت حروف عربی‌نویس به لاتین، و langdetect فقط برای متن مبهم
+ARABIC_SCRIPT_RE = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]')
+LATIN_SCRIPT_RE = re.compile(r'[A-Za-z\u00C0-\u024F]')
+SCRIPT_RATIO_THRESHOLD = 0.7
+
+language_factory = None
+language_factory_lock = threading.Lock()
+
+def load_language_profiles():
+    global language_factory
+    with language_factory_lock:
+        if language_factory is None:
+            factory = langdetect_factory.DetectorFactory()
+            factory.load_profile(langdetect_factory.PROFILES_DIRECTORY)
+            factory.set_seed(0)
+            language_factory = factory
+            translate_log.info("پروفایل‌های langdetect بارگذاری شد.")
+    return language_factory
+
+@lru_cache(maxsize=4096)
+def detect_language(text):
+    arabic = len(ARABIC_SCRIPT_RE.findall(text))
+    latin = len(LATIN_SCRIPT_RE.findall(text))
+    if arabic + latin == 0:
+        return 'en'
+    ratio = arabic / (arabic + latin)
+    if ratio >= SCRIPT_RATIO_THRESHOLD:
+        return 'fa'
+    if ratio <= 1 - SCRIPT_RATIO_THRESHOLD:
+        return 'en'
+    try:
+        detector = load_language_profiles().create()
+        detector.set_prior_map({'fa': 0.5, 'en': 0.5})
+        detector.append(text)
+        return detector.detect()
     except Exception as e:
-        logging.error(f"خطا در پاکسازی متن: {e}")
-        return ""
+        translate_log.error(f"خطا در تشخیص زبان: {e}")
+        return 'fa' if ratio >= 0.5 else 'en'
+
+# پشتیبان‌های ضبط صفحه؛ مختصات همه بر حسب پیکسل فیزیکی صفحه است
+MONITOR_REFRESH_INTERVAL = 5.0
+
+def monitor_at(monitors, x, y):
+    for monitor in monitors:
+        left, top, width, height = monitor
+        if left <= x < left + width and top <= y < top + height:
+            return monitor
+    return None
+
+def qt_screen_monitors(exclude=None):
+    # فقط روی رشته رابط کاربری صدا زده می‌شود؛ نمایشگرها به پیکسل فیزیکی تبدیل می‌شوند
+    # و در Qt5 گوشه بالا-چپ هر نمایشگر ثابت می‌ماند
+    if QApplication.instance() is None:
+        return []
+    monitors = []
+    for screen in QApplication.screens():
+        if screen is exclude:
+            continue
+        ratio = screen.devicePixelRatio()
+        geometry = screen.geometry()
+        monitors.append((geometry.x(), geometry.y(),
+                         int(round(geometry.width() * ratio)), int(round(geometry.height() * ratio))))
+    return monitors
+
+def clamp_region(x, y, width, height, monitor):
+    # ناحیه دور نشانگر کاملاً داخل همان نمایشگر نگه داشته می‌شود، نه فقط از سمت صفر
+    mon_left, mon_top, mon_width, mon_height = monitor
+    width = min(width, mon_width)
+    height = min(height, mon_height)
+    left = min(max(x - width // 2, mon_left), mon_left + mon_width - width)
+    top = min(max(y - height // 2, mon_top), mon_top + mon_height - height)
+    return left, top, width, height
+
+class PyautoguiCaptureBackend:
+    name = "pyautogui"
+
+    def __init__(self):
+        self.monitors = []
+        self.screen_monitors = []
+        self.monitors_checked = 0.0
+
+    def cursor_position(self):
+        x, y = pyautogui.position()
+        return x, y
+
+    def screens_changed(self, monitors):
+        # رشته رابط کاربری چیدمان Qt را به‌صورت فهرست ساده تاپل‌ها می‌فرستد
+        self.screen_monitors = list(monitors)
+        self.monitors = self.screen_monitors
+
+    def query_monitors(self):
+        # pyautogui فقط اندازه نمایشگر اصلی را می‌شناسد؛ چیدمان کامل از رابط کاربری می‌رسد
+        return self.screen_monitors or [(0, 0) + tuple(pyautogui.size())]
+
+    def find_monitor(self, x, y):
+        monitor = monitor_at(self.monitors, x, y)
+        if monitor is None and time.monotonic() - self.monitors_checked > MONITOR_REFRESH_INTERVAL:
+            self.monitors = self.query_monitors()
+            self.monitors_checked = time.monotonic()
+            capture_log.info(f"نمایشگرها: {self.monitors}")
+            monitor = monitor_at(self.monitors, x, y)
+        return monitor
+
+    def grab(self, left, top, width, height):
+        return pyautogui.screenshot(region=(left, top, width, height))
+
+    def close(self):
+        pass
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+class XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p),
+        ("funcs", ctypes.c_void_p * 6),
+    ]
+
+class XRRMonitorInfo(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_ulong),
+        ("primary", ctypes.c_int),
+        ("automatic", ctypes.c_int),
+        ("noutput", ctypes.c_int),
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("mwidth", ctypes.c_int),
+        ("mheight", ctypes.c_int),
+        ("outputs", ctypes.c_void_p),
+    ]
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+Z_PIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+def load_x11_library(name):
+    path = ctypes.util.find_library(name)
+    if not path:
+        raise OSError(f"کتابخانه {name} پیدا نشد")
+    return ctypes.CDLL(path)
+
+class XShmCaptureBackend:
+    # ضبط از طریق حافظه اشتراکی X11: پیکسل‌ها مستقیم در بافرهای از پیش گرفته‌شده نوشته می‌شوند
+    # و به‌صورت نمای numpy (بدون کپی) به پیش‌پردازش می‌رسند
+    name = "xshm"
+    max_buffers = 6
+
+    def __init__(self, display_name=None):
+        self.xlib = load_x11_library("X11")
+        self.xext = load_x11_library("Xext")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self.xrandr = load_x11_library("Xrandr")
+        except OSError:
+            self.xrandr = None
+        self.declare_functions()
+        self.xlib.XInitThreads()
+        self.display = self.xlib.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise OSError("اتصال به نمایشگر X برقرار نشد")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.xlib.XCloseDisplay(self.display)
+            raise OSError("افزونه MIT-SHM در دسترس نیست")
+        # خطای X به‌جای بستن کل برنامه فقط ثبت می‌شود
+        self.last_x_error = None
+        self.error_handler = X_ERROR_HANDLER(self.on_x_error)
+        self.xlib.XSetErrorHandler(self.error_handler)
+        screen = self.xlib.XDefaultScreen(self.display)
+        self.root = self.xlib.XDefaultRootWindow(self.display)
+        self.visual = self.xlib.XDefaultVisual(self.display, screen)
+        self.depth = self.xlib.XDefaultDepth(self.display, screen)
+        self.screen_size = (self.xlib.XDisplayWidth(self.display, screen),
+                            self.xlib.XDisplayHeight(self.display, screen))
+        self.buffers = []
+        self.retired = []
+        self.buffer_size = None
+        self.monitors = []
+        self.monitors_checked = 0.0
+        self.lock = threading.Lock()
+
+    def declare_functions(self):
+        xlib, xext, libc = self.xlib, self.xext, self.libc
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultVisual.restype = ctypes.c_void_p
+        xlib.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XSetErrorHandler.argtypes = [X_ERROR_HANDLER]
+        xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xlib.XQueryPointer.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_uint),
+        ]
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p,
+            ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint,
+        ]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong,
+        ]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        if self.xrandr is not None:
+            self.xrandr.XRRGetMonitors.restype = ctypes.POINTER(XRRMonitorInfo)
+            self.xrandr.XRRGetMonitors.argtypes = [
+                ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.POINTER(ctypes.c_int),
+            ]
+            self.xrandr.XRRFreeMonitors.argtypes = [ctypes.POINTER(XRRMonitorInfo)]
+
+    def on_x_error(self, display, event):
+        self.last_x_error = time.monotonic()
+        return 0
+
+    def create_buffer(self, width, height):
+        shminfo = XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(self.display, self.visual, self.depth, Z_PIXMAP, None,
+                                           ctypes.byref(shminfo), width, height)
+        if not ximage:
+            raise OSError("XShmCreateImage ناموفق بود")
+        if ximage.contents.bits_per_pixel != 32:
+            self.xlib.XFree(ximage)
+            raise OSError(f"عمق رنگ {ximage.contents.bits_per_pixel} بیت پشتیبانی نمی‌شود")
+        stride = ximage.contents.bytes_per_line
+        shminfo.shmid = self.libc.shmget(IPC_PRIVATE, stride * height, IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self.xlib.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmget ناموفق بود")
+        address = self.libc.shmat(shminfo.shmid, None, 0)
+        if address is None or address == ctypes.c_void_p(-1).value:
+            self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            self.xlib.XFree(ximage)
+            raise OSError(ctypes.get_errno(), "shmat ناموفق بود")
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        ximage.contents.data = address
+        self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+        self.xlib.XSync(self.display, 0)
+        # بخش حافظه پس از جدا شدن هر دو طرف خودکار آزاد می‌شود، حتی اگر برنامه ناگهان بسته شود
+        self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        raw = (ctypes.c_uint8 * (stride * height)).from_address(address)
+        buffer = {
+            "shminfo": shminfo,
+            "ximage": ximage,
+            "pixels": np.ndarray((height, width, 4), dtype=np.uint8, buffer=raw, strides=(stride, 4, 1)),
+        }
+        buffer["idle_refs"] = sys.getrefcount(buffer["pixels"])
+        return buffer
+
+    def buffer_in_use(self, buffer):
+        # هر نمای داده‌شده به مصرف‌کننده‌ها و نماهای مشتق از آن به آرایه پایه ارجاع دارند؛
+        # تا وقتی یکی از آن‌ها زنده است بافر نه بازنویسی می‌شود و نه از حافظه جدا می‌شود
+        return sys.getrefcount(buffer["pixels"]) > buffer["idle_refs"]
+
+    def release_buffers(self, buffers):
+        for buffer in buffers:
+            self.xext.XShmDetach(self.display, ctypes.byref(buffer["shminfo"]))
+            self.xlib.XSync(self.display, 0)
+            self.libc.shmdt(buffer["shminfo"].shmaddr)
+            buffer["ximage"].contents.data = None
+            self.xlib.XFree(buffer["ximage"])
+
+    def release_idle_retired(self):
+        idle = [buffer for buffer in self.retired if not self.buffer_in_use(buffer)]
+        if idle:
+            self.retired = [buffer for buffer in self.retired if self.buffer_in_use(buffer)]
+            self.release_buffers(idle)
+
+    def read_into(self, buffer, left, top):
+        self.last_x_error = None
+        ok = self.xext.XShmGetImage(self.display, self.root, buffer["ximage"], left, top, ALL_PLANES)
+        self.xlib.XSync(self.display, 0)
+        return ok and self.last_x_error is None
+
+    def cursor_position(self):
+        root_return, child_return = ctypes.c_ulong(), ctypes.c_ulong()
+        root_x, root_y, win_x, win_y = ctypes.c_int(), ctypes.c_int(), ctypes.c_int(), ctypes.c_int()
+        mask = ctypes.c_uint()
+        with self.lock:
+            self.xlib.XQueryPointer(self.display, self.root, ctypes.byref(root_return), ctypes.byref(child_return),
+                                    ctypes.byref(root_x), ctypes.byref(root_y), ctypes.byref(win_x),
+                                    ctypes.byref(win_y), ctypes.byref(mask))
+        return root_x.value, root_y.value
+
+    def query_monitors(self):
+        monitors = []
+        if self.xrandr is not None:
+            count = ctypes.c_int()
+            with self.lock:
+                info = self.xrandr.XRRGetMonitors(self.display, self.root, 1, ctypes.byref(count))
+                if info:
+                    monitors = [(info[i].x, info[i].y, info[i].width, info[i].height) for i in range(count.value)]
+                    self.xrandr.XRRFreeMonitors(info)
+        return monitors or [(0, 0) + self.screen_size]
+
+    def screens_changed(self, monitors):
+        # چیدمان از XRandR خوانده می‌شود؛ خبر تغییر فقط فهرست فعلی را باطل می‌کند
+        self.monitors = []
+        self.monitors_checked = 0.0
+
+    def find_monitor(self, x, y):
+        monitor = monitor_at(self.monitors, x, y)
+        if monitor is None and time.monotonic() - self.monitors_checked > MONITOR_REFRESH_INTERVAL:
+            # نمایشگر جدیدی وصل شده یا چیدمان عوض شده است
+            self.monitors = self.query_monitors()
+            self.monitors_checked = time.monotonic()
+            capture_log.info(f"نمایشگرها: {self.monitors}")
+            monitor = monitor_at(self.monitors, x, y)
+        return monitor
+
+    def grab(self, left, top, width, height):
+        region = (left, top, width, height)
+        with self.lock:
+            self.release_idle_retired()
+            if self.buffer_size != (width, height):
+                # قاب‌های اندازه قبلی ممکن است هنوز در صف OCR باشند؛ بعداً و پس از رها شدن آزاد می‌شوند
+                self.retired.extend(self.buffers)
+                self.buffers = []
+                self.buffer_size = (width, height)
+            buffer = next((buffer for buffer in self.buffers if not self.buffer_in_use(buffer)), None)
+            if buffer is None and len(self.buffers) < self.max_buffers:
+                buffer = self.create_buffer(width, height)
+                self.buffers.append(buffer)
+            if buffer is None:
+                # همه بافرها هنوز در دست مصرف‌کننده‌ها هستند؛ این قاب در بافر موقت گرفته و کپی می‌شود
+                buffer = self.create_buffer(width, height)
+                try:
+                    if not self.read_into(buffer, left, top):
+                        raise OSError(f"XShmGetImage برای ناحیه {region} ناموفق بود")
+                    return buffer["pixels"][..., 2::-1].copy()
+                finally:
+                    self.release_buffers([buffer])
+            if not self.read_into(buffer, left, top):
+                raise OSError(f"XShmGetImage برای ناحیه {region} ناموفق بود")
+            # پیکسل‌ها به ترتیب BGRA هستند؛ برش معکوس کانال‌ها یک نمای RGB بدون کپی می‌دهد
+            return buffer["pixels"][..., 2::-1]
+
+    def close(self):
+        with self.lock:
+            buffers = self.buffers + self.retired
+            idle = [buffer for buffer in buffers if not self.buffer_in_use(buffer)]
+            if len(idle) < len(buffers):
+                # جدا کردن بافری که هنوز خوانده می‌شود برنامه را از کار می‌اندازد؛ سیستم‌عامل هنگام خروج آزادش می‌کند
+                capture_log.warning(f"{len(buffers) - len(idle)} بافر XShm هنوز در استفاده است و آزاد نشد.")
+            self.release_buffers(idle)
+            self.buffers = []
+            self.retired = []
+            self.buffer_size = None
+            if self.display:
+                self.xlib.XCloseDisplay(self.display)
+                self.display = None
+
+CAPTURE_BACKENDS = {
+    "pyautogui": PyautoguiCaptureBackend,
+    "xshm": XShmCaptureBackend,
+}
+
+def create_capture_backend(prefer="auto"):
+    if prefer == "auto":
+        prefer = "xshm" if sys.platform.startswith("linux") and os.environ.get("DISPLAY") else "pyautogui"
+    if prefer == "xshm":
+        try:
+            backend = XShmCaptureBackend()
+            capture_log.info("ضبط صفحه با حافظه اشتراکی X11 (XShm) فعال شد.")
+            return backend
+        except Exception as e:
+            capture_log.error(f"خطا در راه‌اندازی XShm، استفاده از pyautogui: {e}")
+    return PyautoguiCaptureBackend()
+
+# تشخیص تغییر ناحیه ضبط‌شده پیش از OCR
+def array_thumb(arr, size):
+    # میانگین بلوکی مستقیم روی نمای numpy (معادل BOX) بدون ساختن تصویر PIL از کل ناحیه؛
+    # مرز بلوک‌ها کل قاب را می‌پوشاند تا نوار راست و پایین هم مقایسه شود
+    width, height = size
+    if arr.shape[0] < height or arr.shape[1] < width:
+        image = Image.fromarray(np.ascontiguousarray(arr if arr.ndim == 2 else arr[..., :3]))
+        return np.asarray(image.resize(size, Image.BOX).convert('L'))
+    row_edges = np.linspace(0, arr.shape[0], height + 1).astype(np.intp)
+    col_edges = np.linspace(0, arr.shape[1], width + 1).astype(np.intp)
+    pixels = arr if arr.ndim == 2 else arr[..., :3]
+    sums = np.add.reduceat(pixels, row_edges[:-1], axis=0, dtype=np.float32)
+    sums = np.add.reduceat(sums, col_edges[:-1], axis=1)
+    areas = np.outer(np.diff(row_edges), np.diff(col_edges)).astype(np.float32)
+    if arr.ndim == 2:
+        blocks = sums / areas
+    else:
+        blocks = (sums / areas[..., None]) @ GRAY_WEIGHTS
+    return (blocks + 0.5).astype(np.uint8)
+
+class FrameChangeDetector:
+    # میانگین تفاوت کل تصویر تغییر یک کلمه را رقیق می‌کند؛ به‌جای آن تعداد بلوک‌هایی شمرده می‌شود
+    # که هر کدام به‌تنهایی بیش از آستانه تغییر کرده‌اند
+    def __init__(self, thumb_size=(64, 64), tolerance=12, min_changed_blocks=1, resample=Image.BOX):
+        self.thumb_size = thumb_size
+        self.tolerance = tolerance
+        self.min_changed_blocks = min_changed_blocks
+        self.resample = resample
+        self.last_thumb = None
+        self.last_bytes = None
+        self.hits = 0
+        self.skips = 0
+        self.lock = threading.Lock()
+
+    def make_thumb(self, image):
+        # میانگین‌گیری BOX تغییرات کوچک متن را هم در تصویر کوچک‌شده نگه می‌دارد
+        if isinstance(image, np.ndarray):
+            return array_thumb(image, self.thumb_size)
+        return np.asarray(image.resize(self.thumb_size, self.resample).convert('L'))
+
+    def changed_blocks(self, thumb, last_thumb):
+        diff = np.abs(thumb.astype(np.int16) - last_thumb)
+        return int(np.count_nonzero(diff > self.tolerance))
+
+    def has_changed(self, image):
+        thumb = self.make_thumb(image)
+        thumb_bytes = thumb.tobytes()
+        with self.lock:
+            changed = True
+            if self.last_thumb is not None and self.last_thumb.shape == thumb.shape:
+                if thumb_bytes == self.last_bytes:
+                    changed = False
+                else:
+                    changed = self.changed_blocks(thumb, self.last_thumb) >= self.min_changed_blocks
+            if changed:
+                self.last_thumb = thumb
+                self.last_bytes = thumb_bytes
+                self.hits += 1
+            else:
+                self.skips += 1
+            return changed
+
+    def reset(self):
+        with self.lock:
+            self.last_thumb = None
+            self.last_bytes = None
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "skips": self.skips}
+
+# خط لوله مرحله‌ای ضبط → OCR → ترجمه؛ تلفظ در صف AudioPlayer انجام می‌شود
+class PipelineStage(threading.Thread):
+    def __init__(self, name, handler, pipeline, maxsize=1, tracks_busy=True):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.handler = handler
+        self.pipeline = pipeline
+        self.tracks_busy = tracks_busy
+        self.queue = Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.stopping = False
+
+    def submit(self, generation, payload):
+        # وقتی صف پر است قدیمی‌ترین کار کنار گذاشته می‌شود تا آخرین درخواست برنده باشد
+        while True:
+            try:
+                self.queue.put_nowait((generation, payload))
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                    metrics.incr(f"{self.name}.dropped")
+                except Empty:
+                    pass
+
+    def stop(self):
+        self.stopping = True
+        self.submit(None, None)
+
+    def run(self):
+        while True:
+            generation, payload = self.queue.get()
+            if self.stopping:
+                return
+            if self.pipeline.is_stale(generation):
+                continue
+            if self.tracks_busy:
+                self.pipeline.set_busy(1)
+            try:
+                self.handler(generation, payload)
+            except Exception as e:
+                pipeline_log.error(f"خطا در مرحله {self.name}: {e}")
+            finally:
+                if self.tracks_busy:
+                    self.pipeline.set_busy(-1)
+
+class HoverPipeline:
+    def __init__(self, app):
+        self.app = app
+        self.generation = 0
+        self.active = 0
+        self.last_text = ""
+        self.lock = threading.Lock()
+        self.capture_stage = PipelineStage("capture", self.run_capture, self, tracks_busy=False)
+        self.ocr_stage = PipelineStage("ocr", self.run_ocr, self)
+        self.translate_stage = PipelineStage("translate", self.run_translate, self)
+
+    def start(self):
+        for stage in (self.capture_stage, self.ocr_stage, self.translate_stage):
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        # کار در حال اجرای هر مرحله تمام می‌شود و کارهای صف‌شده کنار گذاشته می‌شوند
+        stages = (self.capture_stage, self.ocr_stage, self.translate_stage)
+        for stage in stages:
+            stage.stop()
+        deadline = time.monotonic() + timeout
+        for stage in stages:
+            stage.join(max(deadline - time.monotonic(), 0))
+            if stage.is_alive():
+                pipeline_log.warning(f"مرحله {stage.name} در مهلت بسته شدن متوقف نشد.")
+
+    def next_generation(self):
+        with self.lock:
+            self.generation += 1
+            return self.generation
+
+    def is_stale(self, generation):
+        return generation is not None and generation != self.generation
+
+    def set_busy(self, delta):
+        with self.lock:
+            was_busy = self.active > 0
+            self.active += delta
+            is_busy = self.active > 0
+        if was_busy != is_busy:
+            self.app.pipeline_busy.emit(is_busy)
+
+    def request_capture(self, force=False):
+        self.capture_stage.submit(None, force)
+
+    def submit_text(self, text):
+        self.translate_stage.submit(self.next_generation(), (text, time.perf_counter()))
+
+    def run_capture(self, generation, force):
+        started_at = time.perf_counter()
+        with metrics.timer("capture"):
+            image = self.app.capture_region()
+        if image is None:
+            return
+        changed = self.app.frame_detector.has_changed(image)
+        self.app.capture_scheduler.report(changed)
+        if not changed and not force:
+            metrics.incr("frame_skipped")
+            pipeline_log.debug("ناحیه ضبط تغییری نکرده است، OCR انجام نشد.")
+            return
+        metrics.incr("frame_changed")
+        self.ocr_stage.submit(None, (image, self.app.last_region, self.app.last_cursor, started_at))
+
+    def run_ocr(self, generation, payload):
+        image, region, cursor, started_at = payload
+        processed_image = self.app.preprocess_image(image)
+        if self.app.ocr_target != "region" and cursor is not None:
+            text, box = self.app.extract_text_at_cursor(image, processed_image, cursor)
+            if box and region:
+                # ماسک فقط روی کلمه یا خط انتخاب‌شده نشان داده می‌شود
+                region = (region[0] + box[0], region[1] + box[1], box[2], box[3])
+        else:
+            text = self.app.extract_text_from_image(processed_image)
+        with metrics.timer("clean"):
+            text = clean_text(text)
+        if not text or text == self.last_text:
+            metrics.observe("pipeline_no_new_text", time.perf_counter() - started_at)
+            return
+        self.last_text = text
+        # متن جدید یعنی نشانگر به محتوای دیگری رفته و ترجمه‌های قبلی دیگر لازم نیستند
+        generation = self.next_generation()
+        self.app.text_ready.emit(generation, text, region)
+        self.translate_stage.submit(generation, (text, started_at))
+
+    def run_translate(self, generation, payload):
+        text, started_at = payload
+        detected_lang, translation_text = self.app.translate_text(text)
+        if self.is_stale(generation):
+            metrics.incr("stale_translation")
+            pipeline_log.debug("ترجمه کهنه کنار گذاشته شد.")
+            return
+        metrics.observe("pipeline", time.perf_counter() - started_at)
+        self.app.translation_ready.emit(generation, text, detected_lang, translation_text)
+
+# زمان‌بندی ضبط بر اساس توقف نشانگر ماوس
+class CaptureScheduler(threading.Thread):
+    def __init__(self, trigger, dwell_time=300, interval=2000, max_backoff=16000):
+        super().__init__(name="capture-scheduler", daemon=True)
+        self.trigger = trigger
+        self.dwell_time = dwell_time / 1000
+        self.interval = interval / 1000
+        self.max_backoff = max_backoff / 1000
+        self.backoff = self.interval
+        self.enabled = True
+        self.moved = True
+        self.last_move = time.monotonic()
+        self.last_capture = 0.0
+        self.running = True
+        self.condition = threading.Condition()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def notify_move(self):
+        with self.condition:
+            self.last_move = time.monotonic()
+            self.moved = True
+            self.backoff = self.interval
+            self.condition.notify()
+
+    def report(self, changed):
+        # وقتی ناحیه زیر نشانگر تغییری نمی‌کند فاصله ضبط‌ها به‌صورت نمایی زیاد می‌شود
+        with self.condition:
+            if changed:
+                self.backoff = self.interval
+            else:
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def set_interval(self, interval):
+        with self.condition:
+            self.interval = interval / 1000
+            self.backoff = max(self.backoff, self.interval)
+            self.condition.notify()
+
+    def set_dwell_time(self, dwell_time):
+        with self.condition:
+            self.dwell_time = dwell_time / 1000
+            self.condition.notify()
+
+    def set_enabled(self, enabled):
+        with self.condition:
+            self.enabled = enabled
+            self.backoff = self.interval
+            self.condition.notify()
+
+    def next_due(self):
+        gap = self.interval if self.moved else max(self.backoff, self.interval)
+        return max(self.last_move + self.dwell_time, self.last_capture + gap)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.running:
+                    return
+                if not self.enabled:
+                    self.condition.wait()
+                    continue
+                wait = self.next_due() - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                self.last_capture = time.monotonic()
+                self.moved = False
+            try:
+                self.trigger()
+            except Exception as e:
+                pipeline_log.error(f"خطا در زمان‌بندی ضبط: {e}")
+
+# خروجی CSV تاریخچه در رشته جدا
+class HistoryExportThread(QThread):
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, store, file_path):
+        super().__init__()
+        self.store = store
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            total = self.store.count()
+            written = 0
+            with open(self.file_path, mode='w', newline='', encoding="utf-8") as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=HISTORY_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for batch in self.store.iter_batches():
+                    writer.writerows(batch)
+                    written += len(batch)
+                    self.progress.emit(written, total)
+            self.succeeded.emit(written)
+        except Exception as e:
+            history_log.error(f"خطا در ذخیره تاریخچه: {e}")
+            self.failed.emit(str(e))
+
+CLIPBOARD_DEBOUNCE_MS = 150
+CLIPBOARD_MAX_CHARS = 5000
 
 # کلاس اصلی برنامه
 class TranslatorApp(QMainWindow):
-    def __init__(self):
+    audio_error = pyqtSignal(str)
+    history_retranslated = pyqtSignal()
+    text_ready = pyqtSignal(int, str, object)
+    translation_ready = pyqtSignal(int, str, str, str)
+    pipeline_busy = pyqtSignal(bool)
+    mask_close_requested = pyqtSignal()
+
+    def __init__(self, translator="google", capture_backend="auto", dictionary_path=DICTIONARY_PATH, warm_up=True):
         super().__init__()
         self.setWindowTitle("سیستم ترجمه و تلفظ هوشمند")
         self.setGeometry(100, 100, 800, 600)
         self.setStyleSheet("background-color: #f0f0f0;")
-        self.transTranslator = Translator()
-        self.last_text = ""
+        with startup_profile.step("init: translation service"):
+            self.translation_service = TranslationService(translator, dictionary_path=dictionary_path)
+        with startup_profile.step("init: capture backend"):
+            self.capture_backend = create_capture_backend(capture_backend)
         self.auto_capture = True
         self.region_width = 200
         self.region_height = 200
         self.capture_interval = 2000
-        self.history = []
+        self.dwell_time = 300
+        with startup_profile.step("init: history store"):
+            self.history_store = HistoryStore()
+        self.history_page = 0
+        self.history_page_size = 50
+        self.history_query = ""
+        self.export_thread = None
         self.mask_window = None
+        self.last_region = None
+        self.last_cursor = None
         self.mouse_listener = None
         self.ocr_mode = True
+        self.ocr_target = "region"
+        self.ocr_refine = False
         self.clipboard_mode = False
         self.last_clipboard_text = ""
-        self.request_queue = Queue(maxsize=1)
         self.executor = ThreadPoolExecutor(max_workers=4)
-        self.initUI()
-        self.start_mouse_listener()
-        self.start_keyboard_listener()
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_region)
-        self.timer.start(1000)
-        self.clipboard_timer = QTimer()
-        self.clipboard_timer.timeout.connect(self.check_clipboard)
-        self.clipboard_timer.start(1000)
+        self.frame_detector = FrameChangeDetector()
+        self.ocr_engine = OcrEngine()
+        with startup_profile.step("init: ui"):
+            self.initUI()
+        self.audio_error.connect(self.show_audio_error)
+        self.history_retranslated.connect(self.on_history_retranslated)
+        audio_player.error_callback = self.audio_error.emit
+        self.text_ready.connect(self.on_text_ready)
+        self.translation_ready.connect(self.on_translation_ready)
+        self.pipeline_busy.connect(self.progress.setVisible)
+        self.mask_close_requested.connect(self.close_mask)
+        with startup_profile.step("init: pipeline"):
+            self.pipeline = HoverPipeline(self)
+            self.pipeline.start()
+            self.capture_scheduler = CaptureScheduler(self.process_region, self.dwell_time, self.capture_interval)
+            self.capture_scheduler.start()
+        # کلیپ‌بورد با سیگنال تغییر Qt پایش می‌شود؛ کپی‌های پشت سر هم با تایمر تک‌ضرب ادغام می‌شوند
+        self.clipboard = QApplication.clipboard()
+        self.clipboard_debounce = QTimer(self)
+        self.clipboard_debounce.setSingleShot(True)
+        self.clipboard_debounce.setInterval(CLIPBOARD_DEBOUNCE_MS)
+        self.clipboard_debounce.timeout.connect(self.check_clipboard)
+        self.clipboard.dataChanged.connect(self.on_clipboard_changed)
+        # چیدمان نمایشگرها فقط روی رشته رابط کاربری از Qt خوانده و به backend ضبط سپرده می‌شود
+        qt_app = QApplication.instance()
+        qt_app.screenAdded.connect(self.on_screen_added)
+        qt_app.screenRemoved.connect(self.on_screen_removed)
+        for screen in QApplication.screens():
+            screen.geometryChanged.connect(self.update_capture_monitors)
+        self.update_capture_monitors()
+        # شنونده‌ها و وابستگی‌های سنگین پس از نمایش پنجره در پس‌زمینه آماده می‌شوند
+        if warm_up:
+            QTimer.singleShot(0, self.start_warm_up)
+
+    def on_screen_added(self, screen):
+        screen.geometryChanged.connect(self.update_capture_monitors)
+        self.update_capture_monitors()
+
+    def on_screen_removed(self, screen):
+        self.update_capture_monitors(exclude=screen)
+
+    def update_capture_monitors(self, *args, exclude=None):
+        monitors = qt_screen_monitors(exclude)
+        capture_log.info(f"چیدمان نمایشگرها در Qt: {monitors}")
+        self.capture_backend.screens_changed(monitors)
+
+    def start_warm_up(self):
+        self.executor.submit(self.warm_up)
+
+    def warm_up(self):
+        steps = [
+            ("listeners", self.start_listeners),
+            ("language profiles", load_language_profiles),
+            ("ocr engine", self.ocr_engine.ensure_backend),
+            ("translator", self.translation_service.warm_up),
+            ("audio mixer", audio_player.warm_up),
+            ("tts", lambda: preload_modules([gtts])),
+        ]
+        for name, step in steps:
+            try:
+                with startup_profile.step(f"warm up: {name}"):
+                    step()
+            except Exception as e:
+                app_log.error(f"خطا در آماده‌سازی {name}: {e}")
+        app_log.info(f"زمان راه‌اندازی:\n{startup_profile.report()}")
 
     def initUI(self):
         central_widget = QWidget()
@@ -169,6 +2411,25 @@ class TranslatorApp(QMainWindow):
         clipboard_action = QAction("حالت کلیپ‌بورد", self, checkable=True)
         clipboard_action.triggered.connect(lambda: self.toggle_modes(False, True))
         mode_menu.addAction(clipboard_action)
+        target_menu = mode_menu.addMenu("محدوده متن")
+        target_group = QActionGroup(self)
+        for target, title in OCR_TARGETS:
+            target_action = QAction(title, self, checkable=True, checked=target == self.ocr_target)
+            target_action.triggered.connect(lambda checked, target=target: self.set_ocr_target(target))
+            target_group.addAction(target_action)
+            target_menu.addAction(target_action)
+        target_menu.addSeparator()
+        refine_action = QAction("OCR مجدد روی برش دقیق", self, checkable=True)
+        refine_action.triggered.connect(lambda checked: setattr(self, 'ocr_refine', checked))
+        target_menu.addAction(refine_action)
+        history_menu = menubar.addMenu("تاریخچه")
+        retranslate_action = QAction("ترجمه مجدد تاریخچه", self)
+        retranslate_action.triggered.connect(self.retranslate_history)
+        history_menu.addAction(retranslate_action)
+        tools_menu = menubar.addMenu("ابزارها")
+        metrics_action = QAction("خروجی آمار عملکرد", self)
+        metrics_action.triggered.connect(self.export_metrics)
+        tools_menu.addAction(metrics_action)
 
         # تنظیمات
         settings_widget = QWidget()
@@ -194,11 +2455,18 @@ class TranslatorApp(QMainWindow):
         self.interval_spin.setMinimum(500)
         self.interval_spin.setMaximum(10000)
         self.interval_spin.setValue(2000)
-        self.interval_spin.valueChanged.connect(lambda: setattr(self, 'capture_interval', self.interval_spin.value()))
+        self.interval_spin.valueChanged.connect(self.set_capture_interval)
+
+        dwell_label = QLabel("زمان توقف نشانگر پیش از ضبط (ms):")
+        self.dwell_spin = QSpinBox()
+        self.dwell_spin.setMinimum(100)
+        self.dwell_spin.setMaximum(3000)
+        self.dwell_spin.setValue(300)
+        self.dwell_spin.valueChanged.connect(self.set_dwell_time)
 
         self.auto_capture_check = QCheckBox("ضبط خودکار")
         self.auto_capture_check.setChecked(True)
-        self.auto_capture_check.stateChanged.connect(lambda: setattr(self, 'auto_capture', self.auto_capture_check.isChecked()))
+        self.auto_capture_check.stateChanged.connect(self.set_auto_capture)
 
         manual_capture_button = QPushButton("ضبط دستی")
         manual_capture_button.clicked.connect(self.manual_capture)
@@ -209,6 +2477,8 @@ class TranslatorApp(QMainWindow):
         settings_layout.addWidget(self.height_slider)
         settings_layout.addWidget(interval_label)
         settings_layout.addWidget(self.interval_spin)
+        settings_layout.addWidget(dwell_label)
+        settings_layout.addWidget(self.dwell_spin)
         settings_layout.addWidget(self.auto_capture_check)
         settings_layout.addWidget(manual_capture_button)
 
@@ -238,6 +2508,10 @@ class TranslatorApp(QMainWindow):
         self.stop_button.setEnabled(False)
         self.stop_button.clicked.connect(stop_audio)
 
+        self.skip_button = QPushButton("رد کردن جمله")
+        self.skip_button.setEnabled(False)
+        self.skip_button.clicked.connect(skip_audio)
+
         self.progress = QProgressBar()
         self.progress.setRange(0, 0)
         self.progress.setVisible(False)
@@ -250,6 +2524,7 @@ class TranslatorApp(QMainWindow):
         result_layout.addWidget(self.translation_text)
         result_layout.addWidget(self.play_button)
         result_layout.addWidget(self.stop_button)
+        result_layout.addWidget(self.skip_button)
         result_layout.addWidget(self.progress)
 
         # تاریخچه
@@ -257,14 +2532,36 @@ class TranslatorApp(QMainWindow):
         history_layout = QVBoxLayout(history_widget)
         main_layout.addWidget(history_widget)
 
+        self.history_search = QLineEdit()
+        self.history_search.setPlaceholderText("جست‌وجو در تاریخچه...")
+        self.history_search.textChanged.connect(self.search_history)
+
         self.history_list = QTextEdit()
         self.history_list.setReadOnly(True)
 
+        pager_widget = QWidget()
+        pager_layout = QHBoxLayout(pager_widget)
+        previous_button = QPushButton("صفحه قبل")
+        previous_button.clicked.connect(lambda: self.show_history_page(self.history_page - 1))
+        self.history_page_label = QLabel()
+        next_button = QPushButton("صفحه بعد")
+        next_button.clicked.connect(lambda: self.show_history_page(self.history_page + 1))
+        pager_layout.addWidget(previous_button)
+        pager_layout.addWidget(self.history_page_label)
+        pager_layout.addWidget(next_button)
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setVisible(False)
+
         export_button = QPushButton("خروجی CSV")
         export_button.clicked.connect(self.export_history)
 
+        history_layout.addWidget(self.history_search)
         history_layout.addWidget(self.history_list)
+        history_layout.addWidget(pager_widget)
         history_layout.addWidget(export_button)
+        history_layout.addWidget(self.export_progress)
+        self.show_history_page(0)
 
         # اسکرول
         scroll_area = QScrollArea()
@@ -275,21 +2572,65 @@ class TranslatorApp(QMainWindow):
     def toggle_modes(self, ocr, clipboard):
         self.ocr_mode = ocr
         self.clipboard_mode = clipboard
+        if clipboard:
+            self.clipboard_debounce.start()
+        self.capture_scheduler.set_enabled(self.auto_capture and self.ocr_mode)
+
+    def set_ocr_target(self, target):
+        self.ocr_target = target
+        self.pipeline.last_text = ""
+        if self.ocr_mode:
+            self.pipeline.request_capture(force=True)
+
+    def set_auto_capture(self):
+        self.auto_capture = self.auto_capture_check.isChecked()
+        self.capture_scheduler.set_enabled(self.auto_capture and self.ocr_mode)
+
+    def set_capture_interval(self):
+        self.capture_interval = self.interval_spin.value()
+        self.capture_scheduler.set_interval(self.capture_interval)
+
+    def set_dwell_time(self):
+        self.dwell_time = self.dwell_spin.value()
+        self.capture_scheduler.set_dwell_time(self.dwell_time)
+
+    def start_listeners(self):
+        self.start_mouse_listener()
+        self.start_keyboard_listener()
 
     def start_mouse_listener(self):
-        self.mouse_listener = mouse.Listener(on_move=self.on_mouse_move)
+        self.mouse_listener = pynput_mouse.Listener(on_move=self.on_mouse_move)
         self.mouse_listener.start()
 
     def on_mouse_move(self, x, y):
+        # این تابع در رشته pynput اجرا می‌شود؛ بستن ماسک به رشته رابط کاربری سپرده می‌شود
+        self.capture_scheduler.notify_move()
+        if self.mask_window:
+            self.mask_close_requested.emit()
+
+    def close_mask(self):
         if self.mask_window:
             self.mask_window.close()
             self.mask_window = None
 
+    def to_logical_geometry(self, left, top, width, height):
+        # ناحیه ضبط بر حسب پیکسل فیزیکی است؛ Qt روی نمایشگرهای HiDPI با پیکسل منطقی کار می‌کند
+        # و در Qt5 گوشه بالا-چپ هر نمایشگر در هر دو دستگاه مختصات یکسان است
+        for screen in QApplication.screens():
+            ratio = screen.devicePixelRatio()
+            geometry = screen.geometry()
+            origin_x, origin_y = geometry.x(), geometry.y()
+            if (origin_x <= left < origin_x + geometry.width() * ratio
+                    and origin_y <= top < origin_y + geometry.height() * ratio):
+                return (int(origin_x + (left - origin_x) / ratio), int(origin_y + (top - origin_y) / ratio),
+                        max(int(width / ratio), 1), max(int(height / ratio), 1))
+        return left, top, width, height
+
     def show_mask(self, left, top, width, height):
         if self.mask_window:
             self.mask_window.close()
         self.mask_window = QWidget()
-        self.mask_window.setGeometry(left, top, width, height)
+        self.mask_window.setGeometry(*self.to_logical_geometry(left, top, width, height))
         self.mask_window.setWindowOpacity(0.3)
         self.mask_window.setStyleSheet("background-color: yellow;")
         self.mask_window.show()
@@ -309,86 +2650,87 @@ class TranslatorApp(QMainWindow):
 
     def manual_capture(self):
         if self.ocr_mode:
-            self.executor.submit(self._process_region)
+            self.pipeline.request_capture(force=True)
 
     def capture_region(self):
         try:
-            width = self.region_width
-            height = self.region_height
-            x, y = pyautogui.position()
-            left = max(x - width // 2, 0)
-            top = max(y - height // 2, 0)
-            image = pyautogui.screenshot(region=(left, top, width, height))
-            logging.info("ناحیه ضبط گرفته شد.")
-            self.show_mask(left, top, width, height)
+            x, y = self.capture_backend.cursor_position()
+            monitor = self.capture_backend.find_monitor(x, y)
+            if monitor is None:
+                # نشانگر بیرون از نمایشگرهای شناخته‌شده است؛ ضبط از نمایشگر دیگر متن اشتباه می‌دهد
+                capture_log.debug("نشانگر (%d, %d) روی هیچ نمایشگری نیست، ضبط انجام نشد.", x, y)
+                return None
+            left, top, width, height = clamp_region(x, y, self.region_width, self.region_height, monitor)
+            image = self.capture_backend.grab(left, top, width, height)
+            capture_log.debug("ناحیه ضبط گرفته شد.")
+            self.last_region = (left, top, width, height)
+            self.last_cursor = (x - left, y - top)
             return image
         except Exception as e:
-            logging.error(f"خطا در گرفتن اسکرین‌شات: {e}")
+            capture_log.error(f"خطا در گرفتن اسکرین‌شات: {e}")
             return None
 
     def preprocess_image(self, image):
-        try:
-            image = image.convert('L')
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2)
-            image = image.filter(ImageFilter.MedianFilter())
-            threshold = 140
-            image = image.point(lambda p: 255 if p > threshold else 0)
-            logging.info("پیش‌پردازش تصویر انجام شد.")
-            return image
-        except Exception as e:
-            logging.error(f"خطا در پیش‌پردازش تصویر: {e}")
-            return image
+        return self.ocr_engine.preprocess_image(image)
 
     def extract_text_from_image(self, image):
-        try:
-            text = pytesseract.image_to_string(image, lang='eng+fas')
-            logging.info(f"متن استخراج شد: {text.strip()}")
-            return text.strip()
-        except Exception as e:
-            logging.error(f"خطا در استخراج متن: {e}")
-            return ""
+        return self.ocr_engine.extract_text_from_image(image)
+
+    def extract_text_at_cursor(self, image, processed, cursor):
+        return self.ocr_engine.extract_text_at_cursor(image, processed, cursor, self.ocr_target,
+                                                      refine=self.ocr_refine)
 
     def translate_text(self, text):
+        return self.translation_service.translate_text(text)
+
+    def translate_many(self, texts):
+        return self.translation_service.translate_many(texts)
+
+    def retranslate_history(self):
+        if not self.history_store.count():
+            QMessageBox.information(self, "ترجمه مجدد تاریخچه", "هیچ رکوردی موجود نیست.")
+            return
+        self.progress.setVisible(True)
+        self.executor.submit(self._retranslate_history)
+
+    def _retranslate_history(self):
         try:
-            detected_lang = detect(text)
-        except Exception as e:
-            logging.error(f"خطا در تشخیص زبان: {e}")
-            detected_lang = 'en'
-        dest_lang = 'en' if detected_lang == 'fa' else 'fa'
-        try:
-            translated = self.translator.translate(text, dest=dest_lang)
-            translation_text = translated.text
-            logging.info(f"ترجمه انجام شد: {translation_text}")
+            for batch in self.history_store.iter_batches(200):
+                results = self.translate_many([record["text"] for record in batch])
+                self.history_store.update_translations(
+                    [(translation_text, record["id"]) for record, (_, translation_text) in zip(batch, results)]
+                )
         except Exception as e:
-            logging.error(f"خطا در ترجمه: {e}")
-            translation_text = "ترجمه امکان‌پذیر نیست."
-        return detected_lang, translation_text
+            history_log.error(f"خطا در ترجمه مجدد تاریخچه: {e}")
+        finally:
+            self.history_retranslated.emit()
+
+    def on_history_retranslated(self):
+        self.progress.setVisible(False)
+        self.show_history_page(self.history_page)
 
     def auto_play_audio(self, detected_lang, text, translation_text):
-        def play():
-            if detected_lang == 'fa':
-                audio_text = translation_text
-                tts_lang = 'en'
-            else:
-                audio_text = text
-                tts_lang = 'en'
-            if audio_text and audio_text != "ترجمه امکان‌پذیر نیست.":
-                generate_and_play_audio(audio_text, tts_lang)
-        threading.Thread(target=play, daemon=True).start()
+        if detected_lang == 'fa':
+            audio_text = translation_text
+            tts_lang = 'en'
+        else:
+            audio_text = text
+            tts_lang = 'en'
+        if audio_text and audio_text != TRANSLATION_FAILED:
+            generate_and_play_audio(audio_text, tts_lang)
+
+    def show_audio_error(self, message):
+        QMessageBox.critical(self, "خطا", "پخش صوت با خطا مواجه شد.")
 
     def on_play(self):
-        try:
-            detected_lang = detect(self.original_text.toPlainText())
-        except Exception:
-            detected_lang = 'en'
+        detected_lang = detect_language(self.original_text.toPlainText())
         if detected_lang == 'fa':
             audio_text = self.translation_text.toPlainText()
             tts_lang = 'en'
         else:
             audio_text = self.original_text.toPlainText()
             tts_lang = 'en'
-        if audio_text and audio_text != "ترجمه امکان‌پذیر نیست.":
+        if audio_text and audio_text != TRANSLATION_FAILED:
             generate_and_play_audio(audio_text, tts_lang)
 
     def add_to_history(self, text, detected_lang, translation_text):
@@ -399,83 +2741,577 @@ class TranslatorApp(QMainWindow):
             "language": "فارسی" if detected_lang == 'fa' else "انگلیسی",
             "translation": translation_text
         }
-        self.history.append(record)
-        history_entry = f"{timestamp} | {record['language']} | {text[:30]}... -> {translation_text[:30]}..."
-        self.history_list.append(history_entry)
+        try:
+            self.history_store.add(record)
+        except sqlite3.Error as e:
+            history_log.error(f"خطا در ثبت تاریخچه: {e}")
+        if self.history_page == 0:
+            self.show_history_page(0)
+
+    def search_history(self, query):
+        self.history_query = query.strip()
+        self.show_history_page(0)
+
+    def show_history_page(self, page):
+        try:
+            total = self.history_store.count(self.history_query)
+            pages = max(1, -(-total // self.history_page_size))
+            self.history_page = min(max(page, 0), pages - 1)
+            records = self.history_store.page(self.history_page, self.history_page_size, self.history_query)
+        except sqlite3.Error as e:
+            history_log.error(f"خطا در خواندن تاریخچه: {e}")
+            return
+        self.history_list.setPlainText("\n".join(
+            f"{record['timestamp']} | {record['language']} | {record['text'][:30]}... -> {record['translation'][:30]}..."
+            for record in records
+        ))
+        self.history_page_label.setText(f"صفحه {self.history_page + 1} از {pages} ({total} رکورد)")
 
     def export_history(self):
-        if not self.history:
+        if self.export_thread and self.export_thread.isRunning():
+            return
+        if not self.history_store.count():
             QMessageBox.information(self, "خروجی تاریخچه", "هیچ رکوردی موجود نیست.")
             return
         file_path, _ = QFileDialog.getSaveFileName(self, "ذخیره تاریخچه", "", "CSV Files (*.csv)")
+        if file_path:
+            self.export_progress.setValue(0)
+            self.export_progress.setVisible(True)
+            self.export_thread = HistoryExportThread(self.history_store, file_path)
+            self.export_thread.progress.connect(self.on_export_progress)
+            self.export_thread.succeeded.connect(self.on_export_succeeded)
+            self.export_thread.failed.connect(self.on_export_failed)
+            self.export_thread.start()
+
+    def export_metrics(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "ذخیره آمار عملکرد", "", "JSON Files (*.json)")
         if file_path:
             try:
-                with open(file_path, mode='w', newline='', encoding="utf-8") as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=["timestamp", "text", "language", "translation"])
-                    writer.writeheader()
-                    for record in self.history:
-                        writer.writerow(record)
-                QMessageBox.information(self, "خروجی تاریخچه", "تاریخچه ذخیره شد.")
+                metrics.export_json(file_path)
             except Exception as e:
-                logging.error(f"خطا در ذخیره تاریخچه: {e}")
-                QMessageBox.critical(self, "خطا", "ذخیره تاریخچه با خطا مواجه شد.")
+                app_log.error(f"خطا در ذخیره آمار عملکرد: {e}")
+                QMessageBox.critical(self, "خطا", "ذخیره آمار عملکرد با خطا مواجه شد.")
+
+    def on_export_progress(self, written, total):
+        self.export_progress.setMaximum(max(total, 1))
+        self.export_progress.setValue(written)
+
+    def on_export_succeeded(self, written):
+        self.export_progress.setVisible(False)
+        QMessageBox.information(self, "خروجی تاریخچه", "تاریخچه ذخیره شد.")
+
+    def on_export_failed(self, message):
+        self.export_progress.setVisible(False)
+        QMessageBox.critical(self, "خطا", "ذخیره تاریخچه با خطا مواجه شد.")
 
     def process_region(self):
         if self.auto_capture and self.ocr_mode:
-            if not self.request_queue.full():
-                self.request_queue.put(self._process_region)
-                self.executor.submit(self._process_request)
+            self.pipeline.request_capture()
 
-    def _process_request(self):
-        try:
-            request = self.request_queue.get()
-            self.progress.setVisible(True)
-            request()
-        finally:
-            self.progress.setVisible(False)
-            self.request_queue.task_done()
+    def on_text_ready(self, generation, text, region):
+        if self.pipeline.is_stale(generation):
+            return
+        if region:
+            # ماسک فقط برای متن جدید نشان داده می‌شود تا خودش باعث تغییر فریم بعدی نشود
+            self.show_mask(*region)
+        self.original_text.setText(text)
 
-    def _process_region(self):
-        try:
-            image = self.capture_region()
-            if image:
-                processed_image = self.preprocess_image(image)
-                text = self.extract_text_from_image(processed_image)
-                text = clean_text(text)
-                if text and text != self.last_text:
-                    self.last_text = text
-                    self.original_text.setText(text)
-                    detected_lang, translation_text = self.translate_text(text)
-                    self.language_text.setText("فارسی" if detected_lang == 'fa' else "انگلیسی")
-                    self.translation_text.setText(translation_text)
-                    self.play_button.setEnabled(True)
-                    self.stop_button.setEnabled(True)
-                    self.add_to_history(text, detected_lang, translation_text)
-                    self.auto_play_audio(detected_lang, text, translation_text)
-        except Exception as e:
-            logging.error(f"خطا در پردازش ناحیه: {e}")
+    def on_translation_ready(self, generation, text, detected_lang, translation_text):
+        if self.pipeline.is_stale(generation):
+            return
+        self.original_text.setText(text)
+        self.language_text.setText("فارسی" if detected_lang == 'fa' else "انگلیسی")
+        self.translation_text.setText(translation_text)
+        self.play_button.setEnabled(True)
+        self.stop_button.setEnabled(True)
+        self.skip_button.setEnabled(True)
+        self.add_to_history(text, detected_lang, translation_text)
+        self.auto_play_audio(detected_lang, text, translation_text)
+
+    def closeEvent(self, event):
+        app_log.info(f"آمار عملکرد:\n{metrics.report()}")
+        # رشته‌های خط لوله پیش از بستن منابعی که استفاده می‌کنند متوقف می‌شوند
+        self.capture_scheduler.stop()
+        self.pipeline.stop()
+        self.translation_service.close()
+        self.history_store.close()
+        self.capture_backend.close()
+        super().closeEvent(event)
+
+    def on_clipboard_changed(self):
+        if self.clipboard_mode:
+            self.clipboard_debounce.start()
 
     def check_clipboard(self):
         if self.clipboard_mode:
             try:
-                clipboard_text = pyperclip.paste()
+                clipboard_text = self.clipboard.text()
+                if len(clipboard_text) > CLIPBOARD_MAX_CHARS:
+                    app_log.warning(f"متن کلیپ‌بورد ({len(clipboard_text)} نویسه) به {CLIPBOARD_MAX_CHARS} نویسه کوتاه شد.")
+                    clipboard_text = clipboard_text[:CLIPBOARD_MAX_CHARS]
                 if clipboard_text and clipboard_text != self.last_clipboard_text:
                     self.last_clipboard_text = clipboard_text
                     text = clean_text(clipboard_text)
                     if text:
                         self.original_text.setText(text)
-                        detected_lang, translation_text = self.translate_text(text)
-                        self.language_text.setText("فارسی" if detected_lang == 'fa' else "انگلیسی")
-                        self.translation_text.setText(translation_text)
-                        self.play_button.setEnabled(True)
-                        self.stop_button.setEnabled(True)
-                        self.add_to_history(text, detected_lang, translation_text)
-                        self.auto_play_audio(detected_lang, text, translation_text)
+                        self.pipeline.submit_text(text)
             except Exception as e:
-                logging.error(f"خطا در بررسی کلیپ‌بورد: {e}")
+                app_log.error(f"خطا در بررسی کلیپ‌بورد: {e}")
+
+# حالت دسته‌ای بدون رابط کاربری
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
+batch_ocr_engine = None
+
+def init_batch_ocr_worker(log_queue, log_levels):
+    # هر پردازه موتور OCR خودش را یک بار می‌سازد
+    global batch_ocr_engine
+    init_worker_logging(log_queue, log_levels)
+    batch_ocr_engine = OcrEngine()
+
+def batch_ocr_image(path):
+    timings = {}
+    try:
+        start = time.perf_counter()
+        with Image.open(path) as image:
+            image = image.convert('RGB')
+        timings["load"] = time.perf_counter() - start
+        start = time.perf_counter()
+        processed = batch_ocr_engine.preprocess_image(image)
+        timings["preprocess"] = time.perf_counter() - start
+        start = time.perf_counter()
+        # خطای OCR در همین‌جا گرفته می‌شود تا در ردیف خروجی ثبت شود
+        text = batch_ocr_engine.ensure_backend().image_to_string(processed)
+        timings["ocr"] = time.perf_counter() - start
+        start = time.perf_counter()
+        text = clean_text(text)
+        timings["clean"] = time.perf_counter() - start
+    except Exception as e:
+        ocr_log.error(f"خطا در پردازش {path}: {e}")
+        return path, "", timings, str(e)
+    return path, text, timings, None
+
+def iter_text_sources(input_path):
+    extension = os.path.splitext(input_path)[1].lower()
+    with open(input_path, newline='', encoding="utf-8") as f:
+        if extension == ".csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            column = header.index("text") if header and "text" in header else 0
+            if header and "text" not in header:
+                yield header[column]
+            for row in reader:
+                if len(row) > column:
+                    yield row[column]
+        else:
+            for line in f:
+                yield line.rstrip("\n")
+
+def iter_batch_records(input_path, workers):
+    if os.path.isdir(input_path):
+        paths = sorted(
+            os.path.join(input_path, name) for name in os.listdir(input_path)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        )
+        import multiprocessing
+        from logging.handlers import QueueListener
+        log_queue = multiprocessing.Queue()
+        listener = QueueListener(log_queue, LogRecordForwarder())
+        listener.start()
+        try:
+            with multiprocessing.Pool(workers, initializer=init_batch_ocr_worker,
+                                      initargs=(log_queue, current_log_levels())) as pool:
+                for path, text, timings, error in pool.imap(batch_ocr_image, paths, chunksize=2):
+                    record = {"source": path, "text": text}
+                    if error:
+                        record["error"] = error
+                    yield record, timings
+                # پیش از بستن شنونده، پردازه‌ها باید لاگ‌های باقی‌مانده را در صف نوشته باشند
+                pool.close()
+                pool.join()
+        finally:
+            listener.stop()
+    else:
+        for line_number, raw_text in enumerate(iter_text_sources(input_path), 1):
+            if not raw_text.strip():
+                continue
+            start = time.perf_counter()
+            text = clean_text(raw_text)
+            yield {"source": f"{input_path}:{line_number}", "text": text}, {"clean": time.perf_counter() - start}
+
+class BatchWriter:
+    FIELDS = ["source", "text", "language", "translation", "audio", "error"]
+
+    def __init__(self, output_path):
+        self.file = open(output_path, mode='w', newline='', encoding="utf-8")
+        self.jsonl = not output_path.lower().endswith(".csv")
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=self.FIELDS, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.jsonl:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def run_batch(input_path, output_path, workers=None, translator="google", translate=True,
+              tts_dir=None, chunk_size=32, dictionary_path=DICTIONARY_PATH):
+    workers = workers or os.cpu_count() or 1
+    translation_service = TranslationService(translator, dictionary_path=dictionary_path) if translate else None
+    if tts_dir:
+        os.makedirs(tts_dir, exist_ok=True)
+    writer = BatchWriter(output_path)
+    batch_metrics = Metrics()
+    audio_numbers = itertools.count(1)
+    processed = 0
+    failed = 0
+    started = time.perf_counter()
+
+    def flush(chunk):
+        # ورودی‌های ناموفق در همان دسته می‌مانند تا ترتیب خروجی با ورودی یکی باشد
+        texts = [record["text"] for record, _ in chunk if record["text"]]
+        if not texts:
+            results = []
+            per_record = None
+        elif translation_service:
+            start = time.perf_counter()
+            results = translation_service.translate_many(texts)
+            per_record = (time.perf_counter() - start) / len(texts)
+        else:
+            results = [(detect_language(text), "") for text in texts]
+            per_record = None
+        results = iter(results)
+        for record, timings in chunk:
+            if not record["text"]:
+                # ورودی ناموفق هم ردیف خودش را دارد تا در خروجی گم نشود
+                record.setdefault("error", "متنی استخراج نشد.")
+            else:
+                detected_lang, translation_text = next(results)
+                record["language"] = detected_lang
+                record["translation"] = translation_text
+                if per_record is not None:
+                    timings["translate"] = per_record
+                if tts_dir:
+                    audio_text = translation_text if detected_lang == 'fa' else record["text"]
+                    if audio_text and audio_text != TRANSLATION_FAILED:
+                        start = time.perf_counter()
+                        audio_path = os.path.join(tts_dir, f"{next(audio_numbers):06d}.mp3")
+                        with open(audio_path, "wb") as f:
+                            f.write(synthesize_speech(audio_text, 'en'))
+                        record["audio"] = audio_path
+                        timings["synthesize"] = time.perf_counter() - start
+            start = time.perf_counter()
+            writer.write(record)
+            timings["write"] = time.perf_counter() - start
+            for stage, seconds in timings.items():
+                batch_metrics.observe(stage, seconds)
+        return len(texts), len(chunk) - len(texts)
+
+    try:
+        chunk = []
+        for record, timings in iter_batch_records(input_path, workers):
+            chunk.append((record, timings))
+            if len(chunk) >= chunk_size:
+                done, errors = flush(chunk)
+                processed += done
+                failed += errors
+                chunk = []
+                print(f"{processed} مورد پردازش شد ({processed / (time.perf_counter() - started):.1f} مورد/ثانیه)")
+        if chunk:
+            done, errors = flush(chunk)
+            processed += done
+            failed += errors
+    finally:
+        writer.close()
+        if translation_service:
+            translation_service.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"مجموع: {processed} مورد در {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.2f} مورد/ثانیه)، "
+          f"{failed} مورد ناموفق")
+    print(batch_metrics.report())
+    return processed
+
+# سنجش کارایی
+def make_benchmark_image(width, height, text="HoverSay benchmark 123"):
+    from PIL import ImageDraw
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    for row in range(10, height - 10, 24):
+        draw.text((10, row), text, fill='black')
+    return image
+
+def benchmark_ocr(sizes=(100, 200, 300, 500), repeats=10):
+    backends = [PytesseractBackend()]
+    if tesserocr is not None:
+        try:
+            backends.append(TesserocrBackend())
+        except Exception as e:
+            print(f"tesserocr در دسترس نیست: {e}")
+    for width in sizes:
+        image = make_benchmark_image(width, width).convert('L')
+        for backend in backends:
+            backend.image_to_string(image)
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                backend.image_to_string(image)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f"{backend.name:12} {width}x{width}: "
+                  f"median={timings[len(timings) // 2]:.1f}ms min={timings[0]:.1f}ms max={timings[-1]:.1f}ms")
+    for backend in backends:
+        backend.close()
+
+def benchmark_capture(size=200, repeats=100):
+    # مقایسه مسیر pyautogui و XShm روی همان ناحیه دور نشانگر (زیر Xvfb هم اجرا می‌شود)
+    backends = [PyautoguiCaptureBackend()]
+    try:
+        backends.append(XShmCaptureBackend())
+    except Exception as e:
+        print(f"XShm در دسترس نیست: {e}")
+    for backend in backends:
+        try:
+            x, y = backend.cursor_position()
+            region = clamp_region(x, y, size, size, backend.find_monitor(x, y) or backend.monitors[0])
+            backend.grab(*region)
+            bench_metrics = Metrics()
+            detector = FrameChangeDetector()
+            preprocess = PreprocessPipeline()
+            for _ in range(repeats):
+                with bench_metrics.timer("capture"):
+                    image = backend.grab(*region)
+                with bench_metrics.timer("change_detect"):
+                    detector.has_changed(image)
+                with bench_metrics.timer("preprocess"):
+                    preprocess.run(image)
+            print(f"{backend.name} {region}:")
+            print(bench_metrics.report())
+        except Exception as e:
+            print(f"{backend.name}: خطا در سنجش ضبط: {e}")
+        finally:
+            backend.close()
+
+# سنجش خط لوله با موتورهای ساختگی صفحه، OCR، مترجم و TTS
+BENCHMARK_WORDS = ["file", "edit", "view", "settings", "open", "save", "close", "help",
+                   "فایل", "ویرایش", "نمایش", "تنظیمات", "باز کردن", "ذخیره", "بستن", "راهنما"]
+
+class CallbackSignal:
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def emit(self, *args):
+        if self.callback:
+            self.callback(*args)
+
+class FakeScreen:
+    def __init__(self, frames=20, size=(200, 200), seed=0):
+        rng = random.Random(seed)
+        self.fixtures = []
+        for _ in range(frames):
+            text = " ".join(rng.choice(BENCHMARK_WORDS) for _ in range(rng.randint(1, 4)))
+            self.fixtures.append((make_benchmark_image(size[0], size[1], text), text))
+        self.index = -1
+        self.current_text = ""
+
+    def capture(self):
+        self.index = (self.index + 1) % len(self.fixtures)
+        image, self.current_text = self.fixtures[self.index]
+        return image
+
+class FakeOcrBackend:
+    name = "fake"
+
+    def __init__(self, screen, delay=0.03):
+        self.screen = screen
+        self.delay = delay
+
+    def image_to_string(self, image, psm=None):
+        time.sleep(self.delay)
+        return self.screen.current_text
+
+    def close(self):
+        pass
+
+class BenchmarkHost:
+    # همان رابطی که HoverPipeline از TranslatorApp انتظار دارد، بدون Qt
+    def __init__(self, screen, ocr_engine, translation_service, on_done):
+        self.screen = screen
+        self.ocr_engine = ocr_engine
+        self.translation_service = translation_service
+        self.frame_detector = FrameChangeDetector()
+        self.capture_scheduler = type("NoScheduler", (), {"report": lambda self, changed: None})()
+        self.last_region = (0, 0) + screen.fixtures[0][0].size
+        self.last_cursor = None
+        self.ocr_target = "region"
+        self.text_ready = CallbackSignal()
+        self.translation_ready = CallbackSignal(on_done)
+        self.pipeline_busy = CallbackSignal()
+
+    def capture_region(self):
+        return self.screen.capture()
+
+    def preprocess_image(self, image):
+        return self.ocr_engine.preprocess_image(image)
+
+    def extract_text_from_image(self, image):
+        return self.ocr_engine.extract_text_from_image(image)
+
+    def translate_text(self, text):
+        return self.translation_service.translate_text(text)
+
+def benchmark_pipeline(frames=20, repeats=3, ocr_delay=0.03, translate_latency=0.05, tts_latency=0.05,
+                       metrics_out=None, baseline=None):
+    # هر تکرار با کش‌های خالی شروع می‌شود (end_to_end) و بلافاصله یک بار دیگر با کش گرم اجرا می‌شود
+    # (end_to_end_warm)، تا p50 فقط مسیر کش‌شده را اندازه نگیرد
+    screen = FakeScreen(frames)
+    ocr_engine = OcrEngine(ocr_backend=FakeOcrBackend(screen, ocr_delay))
+    translation_service = TranslationService(
+        backend=LocalTranslationBackend(latency=translate_latency), cache_path=":memory:", dictionary_path=None
+    )
+    bench_audio_cache = AudioCache()
+
+    def fake_synthesize(text, lang, slow=False):
+        time.sleep(tts_latency)
+        return text.encode("utf-8")
+
+    done = threading.Event()
+
+    def on_done(generation, text, detected_lang, translation_text):
+        synthesize_speech(translation_text if detected_lang == 'fa' else text, 'en',
+                          synthesizer=fake_synthesize, cache=bench_audio_cache)
+        done.set()
+
+    bench_metrics = Metrics()
+    host = BenchmarkHost(screen, ocr_engine, translation_service, on_done)
+    pipeline = HoverPipeline(host)
+    pipeline.start()
+    try:
+        with metrics.forward_to(bench_metrics):
+            for _ in range(repeats):
+                translation_service.translation_cache.clear()
+                bench_audio_cache.clear()
+                detect_language.cache_clear()
+                for timing in ("end_to_end", "end_to_end_warm"):
+                    for _ in range(frames):
+                        done.clear()
+                        started = time.perf_counter()
+                        # force تا هر فریم حتی اگر تکراری باشد کل خط لوله را طی کند
+                        pipeline.last_text = ""
+                        pipeline.request_capture(force=True)
+                        if done.wait(10):
+                            bench_metrics.observe(timing, time.perf_counter() - started)
+                        else:
+                            bench_metrics.incr("benchmark_timeout")
+    finally:
+        pipeline.stop()
+        translation_service.close()
+    print(bench_metrics.report())
+    snapshot = bench_metrics.snapshot()
+    if metrics_out:
+        bench_metrics.export_json(metrics_out)
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            expected = json.load(f)["timings"]["end_to_end"]["p95_ms"]
+        actual = snapshot["timings"]["end_to_end"]["p95_ms"]
+        print(f"end_to_end p95: {actual:.1f}ms (مبنا {expected:.1f}ms)")
+        if actual > expected * 1.2:
+            print("پسرفت کارایی: p95 بیش از ۲۰٪ از مبنا بدتر است.")
+            return False
+    return True
+
+def profile_startup(translator="google", capture_backend="auto", dictionary_path=DICTIONARY_PATH):
+    # زمان تا نمایش پنجره، سپس آماده‌سازی پس‌زمینه به‌صورت همگام تا هزینه هر بخش جدا دیده شود
+    with startup_profile.step("init: QApplication"):
+        app = QApplication(sys.argv)
+    with startup_profile.step("init: TranslatorApp"):
+        window = TranslatorApp(translator, capture_backend, dictionary_path, warm_up=False)
+    window.show()
+
+    def finish():
+        startup_profile.mark("time to window")
+        window.warm_up()
+        remaining = [pyautogui, pytesseract, googletrans, langdetect_factory, gtts, pygame, pynput_mouse, keyboard]
+        for module in remaining:
+            try:
+                preload_modules([module])
+            except Exception as e:
+                print(f"{module._name}: {e}")
+        print(startup_profile.report())
+        window.close()
+        app.quit()
+
+    QTimer.singleShot(0, finish)
+    app.exec_()
+
+def parse_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="HoverSay")
+    parser.add_argument("--bench", choices=["ocr", "pipeline", "capture"], help="اجرای سنجش کارایی و خروج")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="گزارش زمان واردسازی و راه‌اندازی هر بخش تا نمایش پنجره و خروج")
+    parser.add_argument("--metrics-out", help="ذخیره آمار سنجش خط لوله به‌صورت JSON")
+    parser.add_argument("--baseline", help="فایل JSON آمار مبنا برای تشخیص پسرفت")
+    parser.add_argument("--log-level", default="INFO", help="سطح لاگ کلی (DEBUG برای ثبت متن‌های OCR و ترجمه)")
+    parser.add_argument("--log-levels", help="سطح لاگ هر زیرسیستم، مثلاً ocr=DEBUG,audio=WARNING")
+    parser.add_argument("--log-json", action="store_true", help="نوشتن لاگ به‌صورت JSON lines")
+    parser.add_argument("--log-rotate-when", help="چرخش زمانی لاگ (مثلاً midnight)؛ پیش‌فرض چرخش بر اساس حجم")
+    parser.add_argument("--log-max-bytes", type=int, default=5 * 1024 * 1024, help="حداکثر حجم هر فایل لاگ")
+    parser.add_argument("--repeats", type=int, default=10, help="تعداد تکرار هر سنجش")
+    parser.add_argument("--capture", choices=["auto"] + sorted(CAPTURE_BACKENDS), default="auto",
+                        help="روش ضبط صفحه (auto: XShm روی X11، در غیر این صورت pyautogui)")
+    parser.add_argument("--translator", choices=sorted(TRANSLATION_BACKENDS), default="google",
+                        help="موتور ترجمه (local برای آزمایش بدون شبکه)")
+    parser.add_argument("--batch", metavar="INPUT",
+                        help="پردازش دسته‌ای بدون رابط کاربری: پوشه تصاویر یا فایل txt/csv")
+    parser.add_argument("--output", default="batch_output.jsonl", help="خروجی حالت دسته‌ای (jsonl یا csv)")
+    parser.add_argument("--workers", type=int, default=None, help="تعداد پردازه‌های OCR")
+    parser.add_argument("--no-translate", action="store_true", help="فقط OCR و پاکسازی، بدون ترجمه")
+    parser.add_argument("--tts-dir", help="ذخیره تلفظ هر مورد به‌صورت mp3 در این پوشه")
+    parser.add_argument("--dictionary", default=DICTIONARY_PATH, help="فایل نمایه واژه‌نامه آفلاین (پیش‌فرض در پوشه داده کاربر)")
+    parser.add_argument("--build-dictionary", nargs="+", metavar="SOURCE",
+                        help="ساخت نمایه واژه‌نامه از فایل‌های TSV/CSV جفت فارسی/انگلیسی و خروج")
+    parser.add_argument("--dictionary-lookup", metavar="TEXT", help="جست‌وجوی یک کلمه یا پیشوند در واژه‌نامه و خروج")
+    return parser.parse_known_args(argv)[0]
 
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    setup_logging(level=args.log_level.upper(), subsystem_levels=parse_log_levels(args.log_levels),
+                  json_lines=args.log_json, max_bytes=args.log_max_bytes, when=args.log_rotate_when)
+    if args.bench == "ocr":
+        benchmark_ocr(repeats=args.repeats)
+        sys.exit(0)
+    if args.bench == "capture":
+        benchmark_capture(repeats=args.repeats)
+        sys.exit(0)
+    if args.bench == "pipeline":
+        sys.exit(0 if benchmark_pipeline(repeats=args.repeats, metrics_out=args.metrics_out,
+                                         baseline=args.baseline) else 1)
+    if args.build_dictionary:
+        count = build_dictionary(args.build_dictionary, args.dictionary)
+        print(f"{count} مدخل در {args.dictionary} نوشته شد.")
+        sys.exit(0)
+    if args.dictionary_lookup:
+        dictionary = OfflineDictionary(args.dictionary)
+        lang = detect_language(args.dictionary_lookup)
+        print(dictionary.lookup(args.dictionary_lookup, lang))
+        for word, translation in dictionary.prefix(args.dictionary_lookup, lang):
+            print(f"  {word}\t{translation}")
+        dictionary.close()
+        sys.exit(0)
+    if args.profile_startup:
+        profile_startup(args.translator, args.capture, args.dictionary)
+        sys.exit(0)
+    if args.batch:
+        run_batch(args.batch, args.output, args.workers, args.translator,
+                  not args.no_translate, args.tts_dir, dictionary_path=args.dictionary)
+        sys.exit(0)
     app = QApplication(sys.argv)
-    window = TranslatorApp()
+    window = TranslatorApp(translator=args.translator, capture_backend=args.capture,
+                           dictionary_path=args.dictionary)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,56 @@
+# مقایسه TextNormalizer با پیاده‌سازی قبلی clean_text روی پیکره ثابت متن‌های OCR
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from HoverSay import text_normalizer
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_corpus.jsonl")
+
+def legacy_clean_text(text):
+    # پیاده‌سازی قبلی clean_text، مرجع خروجی مورد انتظار؛ حروف ویژه فارسی به الفبای مجاز اضافه شده‌اند
+    try:
+        text = unicodedata.normalize('NFKC', text)
+        text = ''.join(ch for ch in text if ch.isprintable())
+        text = text.replace('|', 'I').replace('1', 'l').replace('0', 'O')
+        text = re.sub(r'[\u200c\u200b-\u200f\u202a-\u202e]', '', text)
+        text = re.sub(r'[^ء-يپچژکگیa-zA-Z0-9\s\.,!?؛،]', '', text)
+        text = re.sub(r'\s+', ' ', text).strip()
+        text = re.sub(r'([!?.,؛،])\1+', r'\1', text)
+        if len(text) < 2:
+            return ""
+        return text
+    except Exception:
+        return ""
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main(repeats=10):
+    corpus = load_corpus()
+    if not corpus:
+        print("پیکره خالی است.")
+        return 1
+    total_chars = sum(len(text) for text in corpus)
+    expected = [legacy_clean_text(text) for text in corpus]
+    mismatches = sum(1 for a, b in zip(expected, text_normalizer.clean_many(corpus)) if a != b)
+    print(f"پیکره: {len(corpus)} متن، {total_chars} نویسه؛ خروجی‌های متفاوت با پیاده‌سازی قبلی: {mismatches}")
+    for name, func in [("legacy", lambda: [legacy_clean_text(t) for t in corpus]),
+                       ("normalizer", lambda: text_normalizer.clean_many(corpus))]:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:12} {len(corpus) / best:,.0f} متن/ثانیه  {total_chars / best / 1e6:.2f}M نویسه/ثانیه")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# بررسی واژه‌نامه آفلاین با ورودی‌هایی به شکل خروجی OCR و کلیپ‌بورد، پس از گذر از clean_text
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from HoverSay import ARABIC_SCRIPT_RE, OfflineDictionary, build_dictionary, clean_text
+
+ENTRIES = [
+    ("کتاب", "book"),
+    ("تاب", "swing"),
+    ("سیب", "apple"),
+    ("سب", "curse"),
+    ("فایل", "file"),
+    ("فال", "fortune"),
+    ("گچ", "chalk"),
+    ("ژاله", "dew"),
+    ("پنجره", "window"),
+    ("می‌خواهم", "I want"),
+]
+
+CASES = [
+    ("کتاب", "book"),
+    ("كتاب", "book"),
+    ("‏کتاب.‎", "book"),
+    ("سیب\n", "apple"),
+    ("سيب", "apple"),
+    ("فایل،", "file"),
+    ("  گچ  ", "chalk"),
+    ("ژاله!!", "dew"),
+    ("پنجره؟", "window"),
+    ("می‌خواهم", "I want"),
+    ("Window", "پنجره"),
+    ("book.", "کتاب"),
+]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "words.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.writelines(f"{fa}\t{en}\n" for fa, en in ENTRIES)
+        path = os.path.join(directory, "dictionary.idx")
+        build_dictionary([source], path)
+        dictionary = OfflineDictionary(path)
+        try:
+            for raw, expected in CASES:
+                text = clean_text(raw)
+                lang = "fa" if ARABIC_SCRIPT_RE.search(text) else "en"
+                entry = dictionary.lookup(text, lang)
+                status = "OK" if entry == expected else "FAIL"
+                failures += entry != expected
+                print(f"{status:4} {raw!r} → {text!r} [{lang}]: {entry!r}")
+        finally:
+            dictionary.close()
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,70 @@
+# بررسی FrameChangeDetector: تغییر یک کلمه زیر نشانگر ثابت باید تشخیص داده شود
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from HoverSay import FrameChangeDetector
+
+def load_font(size=14):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+
+def render(lines, size=(200, 200)):
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    font = load_font()
+    for row, line in enumerate(lines):
+        draw.text((10, 10 + row * 20), line, fill='black', font=font)
+    return image
+
+BASE = ["File  Edit  View", "Quit", "Open recent", "Save as"]
+CASES = [
+    ("بدون تغییر", BASE, False),
+    ("یک کلمه (Quit → Exit)", ["File  Edit  View", "Exit", "Open recent", "Save as"], True),
+    ("یک خط کامل", ["File  Edit  View", "Close window now", "Open recent", "Save as"], True),
+]
+
+EDGE_SIZES = (100, 127, 200, 300, 500)
+
+def render_edge(size, word):
+    # کلمه در آخرین ستون‌ها و سطرهای ناحیه کشیده می‌شود، جایی که بلوک‌های ناقص قرار می‌گیرند
+    image = Image.new('RGB', (size, size), 'white')
+    draw = ImageDraw.Draw(image)
+    font = load_font()
+    if word:
+        left, top, right, bottom = draw.textbbox((0, 0), word, font=font)
+        draw.text((size - right - 1, size - bottom - 1), word, fill='black', font=font)
+    return image
+
+def check(name, base, current, expected, failures):
+    for as_array in (False, True):
+        detector = FrameChangeDetector()
+        first, second = (np.asarray(base), np.asarray(current)) if as_array else (base, current)
+        detector.has_changed(first)
+        changed = detector.has_changed(second)
+        kind = "array" if as_array else "PIL"
+        status = "OK" if changed == expected else "FAIL"
+        failures.append(changed != expected)
+        print(f"{status:4} {name} [{kind}]: changed={changed}")
+
+def main():
+    failures = []
+    for name, lines, expected in CASES:
+        check(name, render(BASE), render(lines), expected, failures)
+    for size in EDGE_SIZES:
+        check(f"گوشه پایین-راست {size}px بدون تغییر", render_edge(size, "Quit"), render_edge(size, "Quit"),
+              False, failures)
+        check(f"گوشه پایین-راست {size}px (Quit → Exit)", render_edge(size, "Quit"), render_edge(size, "Exit"),
+              True, failures)
+        check(f"گوشه پایین-راست {size}px (ظاهر شدن کلمه)", render_edge(size, ""), render_edge(size, "Exit"),
+              True, failures)
+    return sum(failures)
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,104 @@
+# بررسی XShmCaptureBackend روی یک Xvfb موقت: نماهای نگه‌داشته‌شده نباید بازنویسی یا از حافظه جدا شوند
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from HoverSay import XShmCaptureBackend
+
+SCREEN = (640, 480)
+RED = (0xCC, 0x22, 0x11)
+BLUE = (0x11, 0x33, 0xEE)
+
+def free_display():
+    for number in range(90, 200):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}") and not os.path.exists(f"/tmp/.X{number}-lock"):
+            return f":{number}"
+    raise RuntimeError("نمایشگر آزادی برای Xvfb پیدا نشد")
+
+def start_xvfb():
+    display = free_display()
+    process = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", f"{SCREEN[0]}x{SCREEN[1]}x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    socket_path = f"/tmp/.X11-unix/X{display[1:]}"
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Xvfb اجرا نشد")
+        time.sleep(0.05)
+    return display, process
+
+def paint_root(backend, color):
+    xlib = backend.xlib
+    xlib.XSetWindowBackground.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong]
+    xlib.XClearWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+    red, green, blue = color
+    xlib.XSetWindowBackground(backend.display, backend.root, (red << 16) | (green << 8) | blue)
+    xlib.XClearWindow(backend.display, backend.root)
+    xlib.XSync(backend.display, 0)
+
+def same_color(view, color):
+    return view.shape[2] == 3 and bool((view == color).all())
+
+def run_checks(backend):
+    failures = []
+
+    def expect(label, ok):
+        print(f"{'OK' if ok else 'FAIL'}  {label}")
+        if not ok:
+            failures.append(label)
+
+    paint_root(backend, RED)
+    held = backend.grab(10, 10, 120, 80)
+    expect("شکل قاب (80, 120, 3)", held.shape == (80, 120, 3))
+    expect("رنگ قاب اول", same_color(held, RED))
+
+    paint_root(backend, BLUE)
+    second = backend.grab(10, 10, 120, 80)
+    expect("قاب دوم در بافر دیگری نوشته می‌شود", same_color(second, BLUE) and same_color(held, RED))
+
+    # تغییر اندازه در حالی که نمای قبلی هنوز نگه داشته شده است (مثل کشیدن اسلایدرها)
+    resized = backend.grab(0, 0, 200, 150)
+    expect("شکل قاب پس از تغییر اندازه", resized.shape == (150, 200, 3))
+    expect("نمای قدیمی پس از تغییر اندازه معتبر می‌ماند", same_color(held, RED) and same_color(second, BLUE))
+    expect("بافرهای قدیمی در حال استفاده کنار گذاشته می‌شوند", len(backend.retired) > 0)
+
+    del held, second
+    backend.grab(0, 0, 200, 150)
+    expect("بافرهای کنارگذاشته پس از رها شدن آزاد می‌شوند", not backend.retired)
+
+    # وقتی همه بافرها در دست مصرف‌کننده‌اند قاب به‌صورت کپی برمی‌گردد
+    views = [backend.grab(0, 0, 200, 150) for _ in range(backend.max_buffers + 2)]
+    expect("تعداد بافرها محدود می‌ماند", len(backend.buffers) <= backend.max_buffers)
+    expect("قاب‌های اضافه کپی هستند", views[-1].flags.owndata and same_color(views[-1], BLUE))
+    return failures
+
+def main():
+    if shutil.which("Xvfb") is None:
+        print("Xvfb نصب نیست؛ بررسی XShm رد شد.")
+        return 0
+    display, process = start_xvfb()
+    try:
+        backend = XShmCaptureBackend(display)
+        try:
+            failures = run_checks(backend)
+        finally:
+            backend.close()
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+    if failures:
+        print(f"{len(failures)} بررسی ناموفق بود.")
+        return 1
+    print("همه بررسی‌ها موفق بودند.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())